@@ -0,0 +1,411 @@
+# Endpoint load and latency suite.
+#
+# Boots the app in-process (startup and shutdown hooks included) against a real mongod, or
+# with --backend mock against an in-process mongomock stand-in (pip install -r benchmarks/requirements.txt).
+# It seeds deterministic synthetic data at the requested scale and, for each scenario, runs
+# --concurrency async clients for --duration seconds. The JSON report gives throughput,
+# p50/p95/p99 latency, error rate and peak RSS per scenario.
+#
+#   python benchmarks/endpoints.py --backend mock --investors 2000 --output results.json
+#   MONGO_URL=mongodb://localhost:27017 python benchmarks/endpoints.py --investors 100000 --transactions 1000000
+#
+# Requests go through httpx's ASGI transport, so the numbers are the app's own cost without
+# sockets. Peak RSS is this process (app + clients); worker pools run in child processes and
+# are not counted.
+#
+# --baseline compares each scenario with the stored run for the same profile (backend, scale,
+# concurrency). The run exits non-zero on a p50/p95/p99 or RSS increase beyond --tolerance, a
+# throughput drop beyond --tolerance, or new errors. --update-baseline stores this run instead.
+# Baselines depend on the machine, so record them where the comparison runs; the checked-in
+# benchmarks/baseline.json has the default mock profile from a single-CPU runner.
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+
+CITIES = ("Mumbai", "Delhi", "Bangalore", "Pune", "Chennai", "Hyderabad")
+SEARCH_TERMS = ("sharma", "pat", "kumar", "priya", "re", "nair", "gupta", "amit")
+CSV_FIELDS = (
+    "arn", "first_name", "last_name", "email", "phone", "dob", "kyc_status", "pan", "address",
+    "city", "state", "pincode", "folio_ids", "risk_profile", "amt_aum", "preferred_contact", "notes",
+)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # Peak rather than current, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def investor_payload(rng: random.Random) -> dict:
+    tag = uuid.UUID(int=rng.getrandbits(128)).hex[:12]
+    return {
+        "arn": f"ARN-{rng.randint(100000, 999999)}",
+        "first_name": "Bench",
+        "last_name": f"User{tag}",
+        "email": f"bench.{tag}@example.com",
+        "phone": f"+91{rng.randint(7000000000, 9999999999)}",
+        "dob": "1988-04-12",
+        "kyc_status": rng.choice(["Y", "N"]),
+        "pan": f"BNCHX{rng.randint(1000, 9999)}Z",
+        "address": "1 Bench Street",
+        "city": rng.choice(CITIES),
+        "state": "Maharashtra",
+        "pincode": "400001",
+        "folio_ids": [f"FOLB{rng.randint(10000, 99999)}"],
+        "risk_profile": rng.choice(["Low", "Medium", "High"]),
+        "amt_aum": round(rng.uniform(50000, 5000000), 2),
+        "preferred_contact": "email",
+        "notes": "",
+    }
+
+
+def import_csv_body(rng: random.Random, rows: int) -> bytes:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for _ in range(rows):
+        row = investor_payload(rng)
+        row["folio_ids"] = ",".join(row["folio_ids"])
+        writer.writerow(row)
+    return out.getvalue().encode()
+
+
+# Each scenario issues one logical operation and returns the final response
+async def auth_login(client, ctx, rng):
+    return await client.post("/api/auth/login", json=ctx["credentials"])
+
+
+async def investors_list(client, ctx, rng):
+    return await client.get("/api/investors", params={"city": rng.choice(CITIES)}, headers=ctx["headers"])
+
+
+async def investors_page(client, ctx, rng):
+    return await client.get("/api/investors/page", params={"page_size": 100}, headers=ctx["headers"])
+
+
+async def investors_search(client, ctx, rng):
+    return await client.get("/api/investors", params={"search": rng.choice(SEARCH_TERMS)}, headers=ctx["headers"])
+
+
+async def investor_get(client, ctx, rng):
+    return await client.get(f"/api/investors/{rng.choice(ctx['investor_ids'])}", headers=ctx["headers"])
+
+
+async def investor_update(client, ctx, rng):
+    investor_id = rng.choice(ctx["investor_ids"])
+    return await client.put(f"/api/investors/{investor_id}", json={"notes": f"bench {rng.random()}"}, headers=ctx["headers"])
+
+
+async def investor_create_delete(client, ctx, rng):
+    created = await client.post("/api/investors", json=investor_payload(rng), headers=ctx["headers"])
+    if created.status_code >= 400:
+        return created
+    return await client.delete(f"/api/investors/{created.json()['investor_id']}", headers=ctx["headers"])
+
+
+async def import_csv(client, ctx, rng):
+    body = import_csv_body(rng, ctx["import_rows"])
+    return await client.post(
+        "/api/investors/import-csv",
+        files={"file": ("bench.csv", body, "text/csv")},
+        headers=ctx["headers"]
+    )
+
+
+async def analysis_run(client, ctx, rng):
+    return await client.post("/api/analysis/run", json={
+        "selection": {"city": rng.choice(CITIES)},
+        "analysis_type": rng.choice(ctx["analysis_types"]),
+        "force": True
+    }, headers=ctx["headers"])
+
+
+async def analysis_history(client, ctx, rng):
+    return await client.get("/api/analysis/history", headers=ctx["headers"])
+
+
+async def analysis_pdf(client, ctx, rng):
+    # Warm: the same few analyses, served from the report cache after their first render
+    analysis_id = rng.choice(ctx["analysis_ids"])
+    return await client.get(f"/api/analysis/report/{analysis_id}/pdf", headers=ctx["headers"])
+
+
+async def fresh_analysis(client, ctx, rng):
+    # Untimed: a stored analysis copied under a new id, so the timed request has to render it
+    analysis = await ctx["server"].db.analyses.find_one({"analysis_id": rng.choice(ctx["analysis_ids"])}, {"_id": 0})
+    analysis["analysis_id"] = str(uuid.uuid4())
+    await ctx["server"].db.analyses.insert_one(analysis)
+    return analysis["analysis_id"]
+
+
+async def analysis_pdf_cold(client, ctx, rng, analysis_id):
+    return await client.get(f"/api/analysis/report/{analysis_id}/pdf", headers=ctx["headers"])
+
+analysis_pdf_cold.prepare = fresh_analysis
+
+
+async def dashboard(client, ctx, rng):
+    return await client.get("/api/dashboard/stats", headers=ctx["headers"])
+
+
+SCENARIOS = {
+    "auth_login": auth_login,
+    "investors_list": investors_list,
+    "investors_page": investors_page,
+    "investors_search": investors_search,
+    "investor_get": investor_get,
+    "investor_update": investor_update,
+    "investor_create_delete": investor_create_delete,
+    "import_csv": import_csv,
+    "analysis_run": analysis_run,
+    "analysis_history": analysis_history,
+    "analysis_pdf": analysis_pdf,
+    "analysis_pdf_cold": analysis_pdf_cold,
+    "dashboard": dashboard,
+}
+
+
+async def drive(client, scenario, ctx, concurrency: int, seconds: float, seed: int) -> dict:
+    latencies = []
+    errors = 0
+    first_error = None
+    peak_rss = current_rss_mb()
+    deadline = time.perf_counter() + seconds
+
+    async def worker(index: int):
+        nonlocal errors, first_error
+        rng = random.Random(seed * 1000 + index)
+        prepare = getattr(scenario, "prepare", None)
+        while time.perf_counter() < deadline:
+            # A scenario's prepare step runs outside the timed section
+            prepared = (await prepare(client, ctx, rng),) if prepare else ()
+            started = time.perf_counter()
+            try:
+                response = await scenario(client, ctx, rng, *prepared)
+                failure = f"HTTP {response.status_code}" if response.status_code >= 400 else None
+            except Exception as e:
+                failure = f"{type(e).__name__}: {e}"
+            latencies.append((time.perf_counter() - started) * 1000)
+            if failure:
+                errors += 1
+                first_error = first_error or failure
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, current_rss_mb())
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    peak_rss = max(peak_rss, current_rss_mb())
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies, default=0.0), 2),
+        "peak_rss_mb": round(peak_rss, 1),
+        "first_error": first_error,
+    }
+
+
+def profile_key(args) -> str:
+    return f"{args.backend}-i{args.investors}-t{args.transactions}-c{args.concurrency}"
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {previous[metric]} -> {current[metric]}")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput_rps {previous['throughput_rps']} -> {current['throughput_rps']}")
+        if current["error_rate"] > previous["error_rate"] + 0.01:
+            regressions.append(f"{name}: error_rate {previous['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+
+async def setup(server, client, args) -> dict:
+    spec = server.SyntheticDataSpec(
+        seed=args.seed,
+        investors=args.investors,
+        transactions=args.transactions,
+        workers=args.seed_workers,
+    )
+    started = time.perf_counter()
+    seeded = await server.generate_synthetic_data(spec)
+    seed_seconds = time.perf_counter() - started
+
+    credentials = {"email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-password"}
+    response = await client.post("/api/auth/signup", json={**credentials, "full_name": "Bench User"})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+    investor_ids = [
+        doc["investor_id"]
+        for doc in await server.db.investors.find({}, {"_id": 0, "investor_id": 1}).limit(5000).to_list(5000)
+    ]
+    analysis_ids = []
+    for city in CITIES:
+        response = await client.post("/api/analysis/run", json={
+            "selection": {"city": city}, "analysis_type": "risk_summary", "force": True
+        }, headers=headers)
+        response.raise_for_status()
+        analysis_ids.append(response.json()["analysis_id"])
+
+    return {
+        "server": server,
+        "credentials": credentials,
+        "headers": headers,
+        "investor_ids": investor_ids,
+        "analysis_ids": analysis_ids,
+        "import_rows": args.import_rows,
+        # mongomock cannot evaluate the $size projection allocation_check pushes down
+        "analysis_types": ("risk_summary",) if args.backend == "mock" else ("risk_summary", "allocation_check"),
+        "seeded": {**seeded, "seconds": round(seed_seconds, 2)},
+    }
+
+
+async def main(args) -> int:
+    work_dir = Path(tempfile.mkdtemp(prefix="drmf-bench-"))
+    db_name = args.db_name or f"bench_{uuid.uuid4().hex[:8]}"
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["DB_NAME"] = db_name
+    os.environ["SEED_DEMO_ON_STARTUP"] = "false"
+    # Cold caches and spool space per run
+    os.environ["REPORT_CACHE_DIR"] = str(work_dir / "report_cache")
+    os.environ["IMPORT_SPOOL_DIR"] = str(work_dir / "import_spool")
+
+    import server
+
+    if args.backend == "mock":
+        from mongomock_motor import AsyncMongoMockClient
+
+        server.client = AsyncMongoMockClient(tz_aware=True)
+        server.db = server.client[db_name]
+
+    selected = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenario(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    results = {
+        "profile": profile_key(args),
+        "meta": {
+            "backend": args.backend,
+            "investors": args.investors,
+            "transactions": args.transactions,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "scenarios": {},
+    }
+
+    await server.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            ctx = await setup(server, client, args)
+            results["meta"]["seeded"] = ctx["seeded"]
+            for name in selected:
+                scenario = SCENARIOS[name]
+                if args.warmup:
+                    await drive(client, scenario, ctx, args.concurrency, args.warmup, args.seed)
+                results["scenarios"][name] = await drive(client, scenario, ctx, args.concurrency, args.duration, args.seed)
+                stats = results["scenarios"][name]
+                print(
+                    f"{name:24} rps={stats['throughput_rps']:>9.1f} p50={stats['p50_ms']:>8.2f}ms "
+                    f"p95={stats['p95_ms']:>8.2f}ms p99={stats['p99_ms']:>8.2f}ms "
+                    f"errors={stats['errors']} rss={stats['peak_rss_mb']}MB",
+                    file=sys.stderr
+                )
+        if args.backend == "mongod" and not args.keep_db:
+            await server.client.drop_database(db_name)
+    finally:
+        await server.app.router.shutdown()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    baseline_path = Path(args.baseline)
+    baselines = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    if args.update_baseline:
+        baselines[results["profile"]] = results
+        baseline_path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"Stored baseline for {results['profile']} in {baseline_path}", file=sys.stderr)
+        return 0
+    if results["profile"] not in baselines:
+        print(f"No baseline for {results['profile']} in {baseline_path}; nothing to compare", file=sys.stderr)
+        return 0
+    regressions = compare(results, baselines[results["profile"]], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Endpoint throughput, latency and memory benchmark")
+    parser.add_argument("--backend", choices=["mongod", "mock"], default="mongod",
+                        help="mongod uses MONGO_URL; mock uses an in-process mongomock stand-in")
+    parser.add_argument("--db-name", help="Database to seed (default: a fresh bench_* database)")
+    parser.add_argument("--keep-db", action="store_true", help="Keep the seeded mongod database afterwards")
+    parser.add_argument("--investors", type=int, default=2000)
+    parser.add_argument("--transactions", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--seed-workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Unmeasured seconds per scenario")
+    parser.add_argument("--import-rows", type=int, default=100, help="Rows per import_csv request")
+    parser.add_argument("--scenarios", help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative change per metric")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the baseline for its profile")
+    sys.exit(asyncio.run(main(parser.parse_args())))
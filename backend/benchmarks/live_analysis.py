@@ -0,0 +1,154 @@
+# Live AI analysis against a stub model.
+#
+# Boots the app in-process on mongomock (pip install mongomock-motor) and points the LLM client
+# at a stub chat-completions endpoint served through httpx.MockTransport, so no key or network
+# is needed. Each case posts POST /api/analysis/run with use_live_ai and checks the bounds the
+# live path promises:
+#
+#   within_limit  every investor is covered, in ceil(n / LLM_CHUNK_SIZE) map calls plus reduces
+#   over_limit    a selection above LLM_CHUNK_SIZE * LLM_MAX_MAP_CALLS never reaches the model
+#   deadline      a stub slower than LLM_ANALYSIS_DEADLINE_SECONDS falls back within the deadline
+#
+#   python benchmarks/live_analysis.py --stub-latency 0.05
+#
+# Prints one line per case with latency and model calls; exits non-zero if a bound is broken.
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+
+class StubModel:
+    # Answers every chat completion after a fixed delay and counts the prompts it saw
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        content = json.dumps({
+            "executive_summary": f"Stub summary over {prompt.count(chr(10) + '- ')} investor line(s)",
+            "action_items": ["Review allocation"],
+            "risk_alerts": []
+        })
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+async def run_case(client, headers, investor_ids) -> tuple:
+    started = time.perf_counter()
+    response = await client.post("/api/analysis/run", json={
+        "investor_ids": investor_ids,
+        "analysis_type": "risk_summary",
+        "use_live_ai": True,
+        "force": True
+    }, headers=headers)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return response.json(), elapsed
+
+
+async def main(args) -> int:
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["DB_NAME"] = f"live_{uuid.uuid4().hex[:8]}"
+    os.environ["SEED_DEMO_ON_STARTUP"] = "false"
+    os.environ["LLM_CHUNK_SIZE"] = str(args.chunk_size)
+    os.environ["LLM_MAX_MAP_CALLS"] = str(args.max_map_calls)
+
+    import server
+    from mongomock_motor import AsyncMongoMockClient
+
+    server.client = AsyncMongoMockClient(tz_aware=True)
+    server.db = server.client[os.environ["DB_NAME"]]
+
+    limit = args.chunk_size * args.max_map_calls
+    stub = StubModel(args.stub_latency)
+    server.llm_client = server.LLMClient(
+        server.HTTPChatTransport("http://stub-llm/v1", "stub-key", transport=httpx.MockTransport(stub.handle)),
+        model="stub",
+        max_concurrency=args.concurrency,
+        timeout=60,
+        max_retries=0
+    )
+
+    failures = []
+    await server.app.router.startup()
+    try:
+        await server.generate_synthetic_data(server.SyntheticDataSpec(seed=args.seed, investors=limit + 1, workers=0))
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            response = await client.post("/api/auth/signup", json={
+                "email": f"live-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-password", "full_name": "Bench User"
+            })
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['token']}"}
+            investor_ids = [
+                doc["investor_id"]
+                async for doc in server.db.investors.find({}, {"_id": 0, "investor_id": 1}).sort("investor_id", 1)
+            ]
+
+            def report(name, result, elapsed, calls):
+                print(
+                    f"{name:14} investors={result['investor_count']:>6} calls={calls:>4} "
+                    f"ai={result['details'].get('ai_generated', False)!s:5} latency={elapsed * 1000:>9.1f}ms",
+                    file=sys.stderr
+                )
+
+            # Map calls cover every investor, then one reduce per fan-in group per level
+            within = investor_ids[:limit]
+            stub.calls = 0
+            result, elapsed = await run_case(client, headers, within)
+            report("within_limit", result, elapsed, stub.calls)
+            fanin = max(2, server.LLM_REDUCE_FANIN)
+            map_calls = -(-len(within) // args.chunk_size)
+            expected_calls, level = map_calls, map_calls
+            while level > 1:
+                # A trailing group of one passes through without a call
+                expected_calls += level // fanin + (1 if level % fanin > 1 else 0)
+                level = -(-level // fanin)
+            if not result["details"].get("ai_generated") or result["details"].get("prompt_chunks") != map_calls:
+                failures.append(f"within_limit: expected {map_calls} live map chunk(s), got {result['details']}")
+            if stub.calls > expected_calls:
+                failures.append(f"within_limit: {stub.calls} model calls, expected at most {expected_calls}")
+
+            stub.calls = 0
+            result, elapsed = await run_case(client, headers, investor_ids)
+            report("over_limit", result, elapsed, stub.calls)
+            if stub.calls or result["details"].get("ai_generated"):
+                failures.append(f"over_limit: {len(investor_ids)} investors reached the model ({stub.calls} call(s))")
+
+            stub.calls = 0
+            stub.latency = args.deadline * 4
+            server.LLM_ANALYSIS_DEADLINE_SECONDS = args.deadline
+            server.llm_client.cache.clear()
+            result, elapsed = await run_case(client, headers, within)
+            report("deadline", result, elapsed, stub.calls)
+            if result["details"].get("ai_generated") or elapsed > args.deadline + 2:
+                failures.append(f"deadline: took {elapsed:.2f}s against a {args.deadline}s deadline")
+    finally:
+        await server.app.router.shutdown()
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live AI analysis bounds against a stub model")
+    parser.add_argument("--chunk-size", type=int, default=25)
+    parser.add_argument("--max-map-calls", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="Seconds per stub completion")
+    parser.add_argument("--deadline", type=float, default=0.5, help="LLM_ANALYSIS_DEADLINE_SECONDS for the deadline case")
+    parser.add_argument("--seed", type=int, default=42)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,98 @@
+# Measures GET /api/investors latency while a burst of logins hits the server.
+#
+# Usage (against a running server):
+#   BASE_URL=http://localhost:8001 python benchmarks/login_burst.py --logins 200 --concurrency 50
+#
+# Run it once with the server on the baseline commit and once with the password
+# pool enabled; the p99 of the investor reads is the number to compare.
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import httpx
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8001")
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def ensure_user(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/api/auth/signup", json={
+        "email": email,
+        "password": password,
+        "full_name": "Bench User"
+    })
+    if response.status_code == 400:
+        response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+async def login_storm(client, email, password, total, concurrency, results):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            response = await client.post("/api/auth/login", json={"email": email, "password": password})
+            results[response.status_code] = results.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(one() for _ in range(total)))
+
+
+async def reader(client, token, stop: asyncio.Event, latencies):
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/investors", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def main(args):
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "bench-password"
+    limits = httpx.Limits(max_connections=args.concurrency + args.readers + 4)
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60, limits=limits) as client:
+        token = await ensure_user(client, email, password)
+
+        # Idle baseline for the read path
+        idle = []
+        stop = asyncio.Event()
+        task = asyncio.create_task(reader(client, token, stop, idle))
+        await asyncio.sleep(args.warmup)
+        stop.set()
+        await task
+
+        loaded = []
+        statuses = {}
+        stop = asyncio.Event()
+        readers = [asyncio.create_task(reader(client, token, stop, loaded)) for _ in range(args.readers)]
+        started = time.perf_counter()
+        await login_storm(client, email, password, args.logins, args.concurrency, statuses)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*readers)
+
+    print(f"logins: {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s), status codes: {statuses}")
+    for label, samples in (("idle", idle), ("under login burst", loaded)):
+        print(
+            f"GET /api/investors {label}: n={len(samples)} "
+            f"p50={percentile(samples, 50):.1f}ms p99={percentile(samples, 99):.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Investor read latency under a login burst")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    asyncio.run(main(parser.parse_args()))
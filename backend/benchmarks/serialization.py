@@ -0,0 +1,122 @@
+# Compares the CPU cost of turning investor documents into a JSON response body.
+#
+#   legacy  ISO-string timestamps, the per-document fromisoformat loop, then FastAPI's
+#           response_model validation and JSONResponse encoding (the old read path)
+#   native  BSON datetimes straight from Mongo through the same response_model path
+#   fast    BSON datetimes encoded directly with dumps_json (fast_json_responses flag)
+#
+# No database is needed; documents are synthesised in memory.
+#   python benchmarks/serialization.py --rows 1000 --repeats 50
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+import server  # noqa: E402
+
+INVESTOR_LIST_FIELD = create_response_field(name="Response_get_investors", type_=List[server.Investor])
+
+
+def make_documents(rows: int) -> List[dict]:
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    docs = []
+    for i in range(rows):
+        created_at = start + timedelta(seconds=rng.randint(0, 10_000_000), milliseconds=rng.randint(0, 999))
+        docs.append({
+            "investor_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "arn": f"ARN-{rng.randint(100000, 999999)}",
+            "first_name": rng.choice(["Amit", "Priya", "Rahul", "Sneha", "Vikram"]),
+            "last_name": rng.choice(["Sharma", "Patel", "Kumar", "Reddy", "Singh"]),
+            "email": f"investor{i}@example.com",
+            "phone": f"+91{rng.randint(7000000000, 9999999999)}",
+            "dob": "1985-06-15",
+            "kyc_status": rng.choice(["Y", "N"]),
+            "pan": f"ABCDE{rng.randint(1000, 9999)}F",
+            "address": f"{rng.randint(1, 999)} MG Road",
+            "city": rng.choice(["Mumbai", "Pune", "Delhi"]),
+            "state": rng.choice(["Maharashtra", "Delhi"]),
+            "pincode": str(rng.randint(400001, 499999)),
+            "folio_ids": [f"FOL{rng.randint(10000, 99999)}" for _ in range(rng.randint(1, 4))],
+            "risk_profile": rng.choice(["Low", "Medium", "High"]),
+            "amt_aum": round(rng.uniform(50000, 5000000), 2),
+            "preferred_contact": "email",
+            "notes": "",
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+    return docs
+
+
+def as_legacy(docs: List[dict]) -> List[dict]:
+    return [{**doc, "created_at": doc["created_at"].isoformat(), "updated_at": doc["updated_at"].isoformat()} for doc in docs]
+
+
+async def legacy_path(docs: List[dict]) -> bytes:
+    docs = [dict(doc) for doc in docs]  # Motor hands back fresh dicts per request
+    for investor in docs:
+        if isinstance(investor.get('created_at'), str):
+            investor['created_at'] = datetime.fromisoformat(investor['created_at'])
+        if isinstance(investor.get('updated_at'), str):
+            investor['updated_at'] = datetime.fromisoformat(investor['updated_at'])
+    content = await serialize_response(field=INVESTOR_LIST_FIELD, response_content=docs)
+    return JSONResponse(content).body
+
+
+async def native_path(docs: List[dict]) -> bytes:
+    content = await serialize_response(field=INVESTOR_LIST_FIELD, response_content=docs)
+    return JSONResponse(content).body
+
+
+async def fast_path(docs: List[dict]) -> bytes:
+    return server.FastJSONResponse(docs).body
+
+
+async def measure(fn, docs, repeats: int) -> List[float]:
+    await fn(docs)  # warm up
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await fn(docs)
+        samples.append((time.perf_counter() - started) * 1000)
+    return sorted(samples)
+
+
+async def main(args):
+    native_docs = make_documents(args.rows)
+    legacy_docs = as_legacy(native_docs)
+    runs = (
+        ("legacy", legacy_path, legacy_docs),
+        ("native", native_path, native_docs),
+        ("fast", fast_path, native_docs),
+    )
+    baseline = None
+    for label, fn, docs in runs:
+        samples = await measure(fn, docs, args.repeats)
+        median = samples[len(samples) // 2]
+        baseline = baseline or median
+        print(
+            f"{label:7} rows={args.rows} median={median:.2f}ms p95={samples[int(len(samples) * 0.95) - 1]:.2f}ms "
+            f"rows/s={args.rows / median * 1000:,.0f} speedup={baseline / median:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Investor list serialization: legacy vs native datetimes vs fast JSON")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+# Maintenance commands that run against the same database as the API server.
+#
+#   python manage.py ensure-indexes
+#   python manage.py check-indexes     # exits non-zero if any route query shape is a COLLSCAN
+#   python manage.py backfill-search [--only-missing]
+#   python manage.py backfill-datetimes  # convert ISO-string timestamps to BSON dates
+#   python manage.py rebuild-holdings   # recompute holdings and ledger-backed amt_aum from transactions
+#   python manage.py seed-synthetic --seed 42 --investors 1000000 --transactions 20000000 --workers 8
+import argparse
+import asyncio
+import json
+import sys
+
+import server
+
+
+async def cmd_ensure_indexes(args) -> int:
+    created = await server.ensure_indexes()
+    print(json.dumps(created, indent=2))
+    return 0
+
+
+async def cmd_check_indexes(args) -> int:
+    if args.ensure:
+        await server.ensure_indexes()
+    report = await server.explain_query_shapes()
+    failures = 0
+    for entry in report:
+        marker = "COLLSCAN" if entry["collscan"] else "ok"
+        print(f"{marker:8} {entry['collection']:10} {entry['route']:30} {' > '.join(entry['stages'])}")
+        failures += entry["collscan"]
+    if failures:
+        print(f"{failures} query shape(s) are not served by an index", file=sys.stderr)
+    return 1 if failures else 0
+
+
+async def cmd_backfill_search(args) -> int:
+    updated = await server.backfill_search_fields(batch_size=args.batch_size, only_missing=args.only_missing)
+    print(f"Updated search fields on {updated} investor(s)")
+    return 0
+
+
+async def cmd_backfill_datetimes(args) -> int:
+    converted = await server.backfill_datetimes(batch_size=args.batch_size)
+    print(json.dumps(converted, indent=2))
+    return 0
+
+
+async def cmd_rebuild_holdings(args) -> int:
+    result = await server.rebuild_holdings(batch_size=args.batch_size)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+async def cmd_seed_synthetic(args) -> int:
+    spec = server.SyntheticDataSpec(
+        seed=args.seed,
+        investors=args.investors,
+        transactions=args.transactions,
+        reset=not args.append,
+        workers=args.workers,
+        batch_size=args.batch_size,
+    )
+
+    async def progress(collection, counts):
+        print(f"{collection}: {counts['inserted']} inserted, {counts['duplicates']} duplicate(s)", file=sys.stderr)
+
+    result = await server.generate_synthetic_data(spec, on_progress=progress)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+COMMANDS = {
+    "ensure-indexes": cmd_ensure_indexes,
+    "check-indexes": cmd_check_indexes,
+    "backfill-search": cmd_backfill_search,
+    "backfill-datetimes": cmd_backfill_datetimes,
+    "rebuild-holdings": cmd_rebuild_holdings,
+    "seed-synthetic": cmd_seed_synthetic,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="DRMF backend maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("ensure-indexes", help="Create all indexes idempotently")
+
+    check = subparsers.add_parser("check-indexes", help="Explain each route query shape and flag COLLSCANs")
+    check.add_argument("--ensure", action="store_true", help="Create indexes before checking")
+
+    backfill = subparsers.add_parser("backfill-search", help="Rebuild investor search tokens and n-grams")
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    backfill.add_argument("--only-missing", action="store_true", help="Skip investors that already have search fields")
+
+    datetimes = subparsers.add_parser("backfill-datetimes", help="Convert ISO-string timestamps to native BSON dates")
+    datetimes.add_argument("--batch-size", type=int, default=1000)
+
+    rebuild = subparsers.add_parser("rebuild-holdings", help="Recompute holdings and investor AUM from the transaction ledger")
+    rebuild.add_argument("--batch-size", type=int, default=1000)
+
+    seed = subparsers.add_parser("seed-synthetic", help="Load deterministic synthetic investors and transactions")
+    seed.add_argument("--seed", type=int, default=0)
+    seed.add_argument("--investors", type=int, default=server.SEED_DEFAULT_INVESTORS)
+    seed.add_argument("--transactions", type=int, default=0)
+    seed.add_argument("--workers", type=int, default=server.SEED_WORKERS, help="Generator processes; 0 generates in-process")
+    seed.add_argument("--batch-size", type=int, default=server.SEED_BATCH_SIZE)
+    seed.add_argument("--append", action="store_true", help="Keep existing data and indexes instead of dropping them first")
+
+    return parser
+
+
+async def run(args) -> int:
+    try:
+        return await COMMANDS[args.command](args)
+    finally:
+        server.client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(build_parser().parse_args())))
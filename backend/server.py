@@ -1,44 +1,175 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Query, Header, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+import orjson
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure, BulkWriteError, DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, model_validator
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
 from datetime import datetime, timezone, timedelta
 from passlib.context import CryptContext
 import jwt
 import io
 import csv
+import re
+import json
+import base64
+import codecs
+import itertools
+import shutil
+import zlib
+import zipfile
+import socket
+import threading
+from abc import ABC, abstractmethod
+from urllib.parse import urlencode
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib.units import inch
-# from emergentintegrations.llm.chat import LlmChat, UserMessage
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+import httpx
 import random
+import numpy as np
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Timestamps are stored as BSON dates and read back as UTC-aware datetimes
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_KIND = os.getenv("PASSWORD_POOL_KIND", "thread")  # "thread" or "process"
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+PASSWORD_MAX_QUEUE = int(os.getenv("PASSWORD_MAX_QUEUE", "32"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # JWT settings
 JWT_SECRET = os.getenv("JWT_SECRET", "drmf_secret_key_change_in_production")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRATION_HOURS = int(os.getenv("JWT_EXPIRATION_HOURS", "24"))
 
+# Investor search settings
+SEARCH_MAX_GRAM = int(os.getenv("SEARCH_MAX_GRAM", "15"))
+SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", "50"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "200"))
+SEARCH_CANDIDATE_LIMIT = int(os.getenv("SEARCH_CANDIDATE_LIMIT", "2000"))
+
+# Investor listing settings
+INVESTOR_PAGE_SIZE = int(os.getenv("INVESTOR_PAGE_SIZE", "100"))
+INVESTOR_MAX_PAGE_SIZE = int(os.getenv("INVESTOR_MAX_PAGE_SIZE", "1000"))
+INVESTOR_STREAM_BATCH_SIZE = int(os.getenv("INVESTOR_STREAM_BATCH_SIZE", "500"))
+# GET /investors returns at most this many rows, newest first; the rest are behind /investors/page
+INVESTOR_LIST_MAX = int(os.getenv("INVESTOR_LIST_MAX", "1000"))
+
+# CSV import settings
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", str(1024 * 1024)))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", str(os.cpu_count() or 1)))  # 0 validates in the thread pool
+IMPORT_MAX_INFLIGHT_BATCHES = int(os.getenv("IMPORT_MAX_INFLIGHT_BATCHES", str(max(2, IMPORT_WORKERS * 2))))
+
+# Investor write settings
+INVESTOR_UPDATE_MAX_ATTEMPTS = int(os.getenv("INVESTOR_UPDATE_MAX_ATTEMPTS", "5"))
+
+# Bulk investor mutation settings
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+
+# Synthetic data settings
+SEED_DEFAULT_INVESTORS = int(os.getenv("SEED_DEFAULT_INVESTORS", "50"))
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "10000"))
+SEED_WORKERS = int(os.getenv("SEED_WORKERS", str(os.cpu_count() or 1)))
+SEED_JOB_LEASE_SECONDS = float(os.getenv("SEED_JOB_LEASE_SECONDS", "300"))
+# Load the demo set at startup when the investors collection is empty
+SEED_DEMO_ON_STARTUP = os.getenv("SEED_DEMO_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# Transaction ledger settings
+TRANSACTION_BATCH_SIZE = int(os.getenv("TRANSACTION_BATCH_SIZE", "5000"))
+TRANSACTION_PAGE_SIZE = int(os.getenv("TRANSACTION_PAGE_SIZE", "100"))
+TRANSACTION_MAX_PAGE_SIZE = int(os.getenv("TRANSACTION_MAX_PAGE_SIZE", "1000"))
+HOLDINGS_LEASE_SECONDS = float(os.getenv("HOLDINGS_LEASE_SECONDS", "60"))
+
+# Background import job settings
+IMPORT_SPOOL_DIR = Path(os.getenv("IMPORT_SPOOL_DIR", str(ROOT_DIR / "import_spool")))
+IMPORT_JOB_LEASE_SECONDS = float(os.getenv("IMPORT_JOB_LEASE_SECONDS", "60"))
+# Set when IMPORT_SPOOL_DIR is storage shared by every host; otherwise a stale job is only
+# taken over by a worker on the host that spooled its upload
+IMPORT_SPOOL_SHARED = os.getenv("IMPORT_SPOOL_SHARED", "false").lower() in ("1", "true", "yes")
+WORKER_HOST = socket.gethostname()
+WORKER_ID = f"{WORKER_HOST}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+# Investor export settings
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+# PDF report settings
+REPORT_TEMPLATE_VERSION = "1"  # bump whenever render_analysis_pdf output changes
+REPORT_RENDER_KIND = os.getenv("REPORT_RENDER_KIND", "process")  # "thread" or "process"
+REPORT_RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", "2"))
+REPORT_RENDER_MAX_QUEUE = int(os.getenv("REPORT_RENDER_MAX_QUEUE", "64"))
+REPORT_CACHE_DIR = Path(os.getenv("REPORT_CACHE_DIR", str(ROOT_DIR / "report_cache")))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+REPORT_BUNDLE_MAX_ITEMS = int(os.getenv("REPORT_BUNDLE_MAX_ITEMS", "100"))
+
+# Dashboard statistics settings
+DASHBOARD_RECONCILE_SECONDS = float(os.getenv("DASHBOARD_RECONCILE_SECONDS", "300"))
+
+# Investor facet settings
+FACETS_CACHE_TTL_SECONDS = float(os.getenv("FACETS_CACHE_TTL_SECONDS", "30"))
+FACETS_CACHE_MAX_ENTRIES = int(os.getenv("FACETS_CACHE_MAX_ENTRIES", "256"))
+
+# Feature flag settings
+FEATURE_FLAGS_REFRESH_SECONDS = float(os.getenv("FEATURE_FLAGS_REFRESH_SECONDS", "5"))
+
+# Analysis engine settings
+ANALYSIS_PUSHDOWN_THRESHOLD = int(os.getenv("ANALYSIS_PUSHDOWN_THRESHOLD", "50000"))
+ANALYSIS_LOAD_BATCH_SIZE = int(os.getenv("ANALYSIS_LOAD_BATCH_SIZE", "5000"))
+# Bump whenever an analysis type's metrics or wording change so memoized results are recomputed
+ANALYSIS_ENGINE_VERSION = "1"
+ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "3600"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "512"))
+
+# Live AI (LLM client) settings
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY") or os.getenv("EMERGENT_LLM_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+# Investors per map prompt, and partial summaries per reduce prompt
+LLM_CHUNK_SIZE = int(os.getenv("LLM_CHUNK_SIZE", "50"))
+LLM_REDUCE_FANIN = int(os.getenv("LLM_REDUCE_FANIN", "10"))
+# Larger selections skip the model (LLM_CHUNK_SIZE * LLM_MAX_MAP_CALLS investors at most), and
+# a live run that outlasts the deadline falls back to the analysis engine
+LLM_MAX_MAP_CALLS = int(os.getenv("LLM_MAX_MAP_CALLS", "20"))
+LLM_ANALYSIS_DEADLINE_SECONDS = float(os.getenv("LLM_ANALYSIS_DEADLINE_SECONDS", "90"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+
+# Principal cache settings
+# Upper bound on how long a role or subscription change takes to reach a worker
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
 # Security
 security = HTTPBearer()
 
@@ -86,6 +217,8 @@ class Investor(BaseModel):
     amt_aum: float
     preferred_contact: str
     notes: str = ""
+    # Bumped by every write; the ETag of GET /investors/{id} and the If-Match target of PUT
+    version: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -138,15 +271,53 @@ class Transaction(BaseModel):
     amount: float
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class TransactionPage(BaseModel):
+    items: List[Transaction]
+    next_cursor: Optional[str] = None
+
+class InvestorSelection(BaseModel):
+    search: Optional[str] = None
+    kyc_status: Optional[str] = None
+    risk_profile: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+    min_aum: Optional[float] = Field(None, ge=0)
+    max_aum: Optional[float] = Field(None, ge=0)
+
 class AnalysisRequest(BaseModel):
-    investor_ids: List[str]
+    # Either an explicit id list or a selection resolved on the server
+    investor_ids: Optional[List[str]] = None
+    selection: Optional[InvestorSelection] = None
     analysis_type: str
     use_live_ai: bool = False
+    force: bool = False
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.investor_ids is None) == (self.selection is None):
+            raise ValueError("Provide exactly one of investor_ids or selection")
+        return self
+
+class BulkInvestorTarget(BaseModel):
+    # Either explicit ids or a selection filter, resolved once to the matching ids
+    investor_ids: Optional[List[str]] = None
+    filter: Optional[InvestorSelection] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.investor_ids is None) == (self.filter is None):
+            raise ValueError("Provide exactly one of investor_ids or filter")
+        return self
+
+class BulkInvestorUpdate(BulkInvestorTarget):
+    update: InvestorUpdate
 
 class AnalysisResult(BaseModel):
     model_config = ConfigDict(extra="ignore")
     analysis_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    investor_ids: List[str]
+    investor_ids: List[str] = []
+    selection: Optional[Dict[str, Any]] = None
+    investor_count: int = 0
     analysis_type: str
     executive_summary: str
     action_items: List[str]
@@ -154,9 +325,21 @@ class AnalysisResult(BaseModel):
     details: Dict[str, Any]
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class ReportBundleRequest(BaseModel):
+    analysis_ids: Optional[List[str]] = None
+    analysis_type: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    limit: Optional[int] = Field(None, ge=1, le=REPORT_BUNDLE_MAX_ITEMS)
+
+class InvestorPage(BaseModel):
+    items: List[Investor]
+    next_cursor: Optional[str] = None
+
 class FeatureFlags(BaseModel):
     use_live_ai: bool = False
     allow_csv_import: bool = True
+    fast_json_responses: bool = False
 
 class PasswordReset(BaseModel):
     email: EmailStr
@@ -174,6 +357,70 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# Runs blocking work (bcrypt, PDF rendering) off the event loop with a concurrency cap
+# and a bounded queue
+class BoundedWorkerPool:
+    def __init__(self, name: str, kind: str, workers: int, max_queue: int, busy_detail: str):
+        self.name = name
+        self.kind = kind
+        self.busy_detail = busy_detail
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = None
+        self._semaphore = asyncio.Semaphore(self.workers)
+        self._pending = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, fn, *args):
+        # Everything beyond the running workers waits in the queue; past that we shed load.
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail=self.busy_detail,
+                headers={"Retry-After": "1"}
+            )
+        self._pending += 1
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+password_pool = BoundedWorkerPool(
+    "bcrypt", PASSWORD_POOL_KIND, PASSWORD_POOL_SIZE, PASSWORD_MAX_QUEUE,
+    "Authentication service is busy, please retry"
+)
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
@@ -181,68 +428,884 @@ def create_access_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+# In-process cache with per-entry expiry and LRU eviction once maxsize is reached
+class TTLLRUCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+# Decoded JWT payloads keyed by the raw token; entries never outlive the token's exp.
+token_cache = TTLLRUCache(PRINCIPAL_CACHE_MAX_ENTRIES, JWT_EXPIRATION_HOURS * 3600)
+# Resolved User principals keyed by user id. No route writes users after signup; role and
+# subscription changes land in the database directly and, since each worker has its own
+# cache, take effect within PRINCIPAL_CACHE_TTL_SECONDS (0 disables the cache).
+principal_cache = TTLLRUCache(PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_CACHE_TTL_SECONDS)
+
+def decode_access_token(token: str) -> dict:
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
-    
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    token_cache.set(token, payload, ttl=payload["exp"] - time.time())
+    return payload
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = decode_access_token(credentials.credentials)
+    user_id: str = payload["sub"]
+
+    user = principal_cache.get(user_id)
+    if user is not None:
+        return user
+
     user = await db.users.find_one({"id": user_id}, {"_id": 0})
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
-    return User(**user)
-
-# Seed data generator
-async def generate_seed_investors():
-    count = await db.investors.count_documents({})
-    if count > 0:
-        return
-    
-    indian_cities = [
-        ("Mumbai", "Maharashtra"), ("Delhi", "Delhi"), ("Bangalore", "Karnataka"),
-        ("Hyderabad", "Telangana"), ("Chennai", "Tamil Nadu"), ("Kolkata", "West Bengal"),
-        ("Pune", "Maharashtra"), ("Ahmedabad", "Gujarat"), ("Jaipur", "Rajasthan"),
-        ("Surat", "Gujarat")
+    user = User(**user)
+    principal_cache.set(user_id, user)
+    return user
+
+# Investor search
+# Every investor carries two derived arrays, rebuilt whenever a searchable field is written:
+#   search_tokens - normalized whole tokens (exact matches and ranking)
+#   search_grams  - edge n-grams of those tokens (prefix matches as the user types)
+SEARCH_FIELDS = ("first_name", "last_name", "email", "arn", "pan")
+SEARCH_INTERNAL_FIELDS = ("search_tokens", "search_grams")
+# Exactly the Investor fields, so a read can be encoded without a model round trip
+INVESTOR_PROJECTION = {"_id": 0, **{field: 1 for field in Investor.model_fields}}
+
+_SEARCH_TERM_SPLIT = re.compile(r"[^a-z0-9@._-]+")
+_SEARCH_PART_SPLIT = re.compile(r"[^a-z0-9]+")
+_PAN_PATTERN = re.compile(r"^[a-z]{5}[0-9]{4}[a-z]$")
+_ARN_PATTERN = re.compile(r"^arn-?([0-9]+)$")
+_EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[a-z0-9]+$")
+
+def _search_terms(value: str) -> List[str]:
+    return [term for term in _SEARCH_TERM_SPLIT.split(value.lower()) if term]
+
+def build_search_fields(doc: dict) -> dict:
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        for term in _search_terms(str(doc.get(field) or "")):
+            tokens.add(term)
+            # "arn-123456" is also findable by "123456", "amit.s@x.com" by "amit"
+            tokens.update(part for part in _SEARCH_PART_SPLIT.split(term) if part)
+    grams = set(tokens)
+    for token in tokens:
+        for size in range(1, min(len(token), SEARCH_MAX_GRAM) + 1):
+            grams.add(token[:size])
+    return {"search_tokens": sorted(tokens), "search_grams": sorted(grams)}
+
+def _exact_search_key(term: str) -> Optional[str]:
+    if _PAN_PATTERN.match(term) or _EMAIL_PATTERN.match(term):
+        return term
+    arn = _ARN_PATTERN.match(term)
+    if arn:
+        return f"arn-{arn.group(1)}"
+    return None
+
+def search_grams_filter(terms: List[str]) -> dict:
+    # Longest key first so the multikey index scan starts from the most selective gram
+    keys = sorted({term[:SEARCH_MAX_GRAM] for term in terms}, key=len, reverse=True)
+    return {"search_grams": {"$all": keys}}
+
+async def search_investors(search: str, filters: dict, limit: int) -> List[dict]:
+    terms = _search_terms(search)
+    if not terms:
+        return []
+
+    # PAN / ARN / email typed in full resolve through the token index with no ranking
+    if len(terms) == 1:
+        exact_key = _exact_search_key(terms[0])
+        if exact_key:
+            exact = await db.investors.find(
+                {"search_tokens": exact_key, **filters}, INVESTOR_PROJECTION
+            ).limit(limit).to_list(limit)
+            if exact:
+                return exact
+
+    pipeline = [
+        {"$match": {**search_grams_filter(terms), **filters}},
+        {"$limit": SEARCH_CANDIDATE_LIMIT},
+        {"$addFields": {"_score": {"$add": [
+            {"$cond": [{"$in": [term, "$search_tokens"]}, 2, 1]} for term in terms
+        ]}}},
+        {"$sort": {"_score": -1, "last_name": 1, "first_name": 1}},
+        {"$limit": limit},
+        {"$project": INVESTOR_PROJECTION}
     ]
-    
-    first_names = ["Amit", "Priya", "Rahul", "Sneha", "Vijay", "Anjali", "Sanjay", "Pooja", "Rajesh", "Kavita"]
-    last_names = ["Sharma", "Patel", "Kumar", "Singh", "Reddy", "Gupta", "Joshi", "Mehta", "Nair", "Desai"]
-    
-    investors_data = []
-    for i in range(50):
-        city, state = random.choice(indian_cities)
+    return await db.investors.aggregate(pipeline).to_list(limit)
+
+async def backfill_search_fields(batch_size: int = 1000, only_missing: bool = False) -> int:
+    query = {"search_grams": {"$exists": False}} if only_missing else {}
+    projection = {"_id": 1, **{field: 1 for field in SEARCH_FIELDS}}
+    updated = 0
+    batch = []
+    async for doc in db.investors.find(query, projection).batch_size(batch_size):
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": build_search_fields(doc)}))
+        if len(batch) >= batch_size:
+            result = await db.investors.bulk_write(batch, ordered=False)
+            updated += result.modified_count
+            batch = []
+    if batch:
+        result = await db.investors.bulk_write(batch, ordered=False)
+        updated += result.modified_count
+    return updated
+
+def investor_to_document(investor: Investor) -> dict:
+    investor_dict = investor.model_dump()
+    investor_dict.update(build_search_fields(investor_dict))
+    return investor_dict
+
+# JSON responses
+# Documents read with a model-shaped projection are already what the response model would
+# emit, so the opt-in fast path (fast_json_responses flag) encodes them directly with orjson
+# instead of validating every row. UTC datetimes are written with a Z suffix like pydantic.
+FAST_JSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC
+
+def dumps_json(value) -> bytes:
+    return orjson.dumps(value, default=str, option=FAST_JSON_OPTIONS)
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+# Investor listing
+# Newest first; investor_id breaks ties between investors created in the same instant.
+INVESTOR_LIST_SORT = [("created_at", DESCENDING), ("investor_id", DESCENDING)]
+
+def build_investor_filters(
+    kyc_status: Optional[str] = None,
+    risk_profile: Optional[str] = None,
+    city: Optional[str] = None,
+    state: Optional[str] = None
+) -> dict:
+    query = {}
+    if kyc_status:
+        query["kyc_status"] = kyc_status
+    if risk_profile:
+        query["risk_profile"] = risk_profile
+    if city:
+        query["city"] = city
+    if state:
+        query["state"] = state
+    return query
+
+def build_selection_query(selection: InvestorSelection) -> dict:
+    query = build_investor_filters(selection.kyc_status, selection.risk_profile, selection.city, selection.state)
+    aum = {}
+    if selection.min_aum is not None:
+        aum["$gte"] = selection.min_aum
+    if selection.max_aum is not None:
+        aum["$lte"] = selection.max_aum
+    if aum:
+        query["amt_aum"] = aum
+    # Every search term must match, unranked and unlimited: this is a selection, not a lookup
+    terms = _search_terms(selection.search or "")
+    if terms:
+        query.update(search_grams_filter(terms))
+    return query
+
+def encode_investor_cursor(doc: dict) -> str:
+    raw = json.dumps([as_datetime(doc["created_at"]).isoformat(), doc["investor_id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_investor_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, investor_id = json.loads(raw)
+        created_at = datetime.fromisoformat(created_at)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "investor_id": {"$lt": investor_id}}
+    ]}
+
+async def iter_investor_batches(query: dict, projection: dict, batch_size: int = INVESTOR_STREAM_BATCH_SIZE):
+    # Yields lists of at most batch_size documents straight off the Motor cursor
+    cursor = db.investors.find(query, projection).sort(INVESTOR_LIST_SORT).batch_size(batch_size)
+    batch = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def stream_investors_ndjson(query: dict, projection: dict):
+    async for batch in iter_investor_batches(query, projection):
+        yield b"".join(dumps_json(doc) + b"\n" for doc in batch)
+
+async def stream_investors_json_array(query: dict, projection: dict):
+    yield b"["
+    first = True
+    async for batch in iter_investor_batches(query, projection):
+        chunk = b",".join(dumps_json(doc) for doc in batch)
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
+
+# Investor export
+EXPORT_FIELDS = ("investor_id",) + tuple(InvestorCreate.model_fields) + ("created_at", "updated_at")
+EXPORT_MEDIA_TYPES = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "columnar": ("application/gzip", "columnar.json.gz"),
+}
+
+def parse_export_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(EXPORT_FIELDS)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in EXPORT_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"Unknown export fields: {', '.join(unknown) or fields}")
+    return selected
+
+async def export_investors_csv(query: dict, fields: List[str]):
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(fields)
+    async for batch in iter_investor_batches(query, projection, EXPORT_BATCH_SIZE):
+        for doc in batch:
+            writer.writerow([
+                ",".join(value) if isinstance(value, list) else value.isoformat() if isinstance(value, datetime) else value
+                for value in (doc.get(field, "") for field in fields)
+            ])
+        yield output.getvalue().encode()
+        output.seek(0)
+        output.truncate()
+    if output.tell():
+        yield output.getvalue().encode()
+
+async def export_investors_ndjson(query: dict, fields: List[str]):
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    async for batch in iter_investor_batches(query, projection, EXPORT_BATCH_SIZE):
+        yield b"".join(dumps_json(doc) + b"\n" for doc in batch)
+
+async def export_investors_columnar(query: dict, fields: List[str]):
+    # Gzipped stream of row groups, one JSON object per line mapping each field to its column
+    # of values; a reader can load any group column-wise without parsing row objects.
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    yield compressor.compress(json.dumps({"fields": fields, "row_group_size": EXPORT_BATCH_SIZE}).encode() + b"\n")
+    async for batch in iter_investor_batches(query, projection, EXPORT_BATCH_SIZE):
+        columns = {field: [doc.get(field) for doc in batch] for field in fields}
+        chunk = compressor.compress(dumps_json(columns) + b"\n")
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+EXPORT_WRITERS = {
+    "csv": export_investors_csv,
+    "ndjson": export_investors_ndjson,
+    "columnar": export_investors_columnar,
+}
+
+# Index bootstrap
+INDEX_SPECS = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "investors": [
+        IndexModel([("investor_id", ASCENDING)], name="investor_id_unique", unique=True),
+        IndexModel([("kyc_status", ASCENDING), ("risk_profile", ASCENDING), ("city", ASCENDING)], name="kyc_risk_city"),
+        IndexModel([("risk_profile", ASCENDING), ("city", ASCENDING)], name="risk_city"),
+        IndexModel([("city", ASCENDING)], name="city"),
+        IndexModel([("state", ASCENDING), ("risk_profile", ASCENDING)], name="state_risk"),
+        IndexModel([("amt_aum", ASCENDING)], name="amt_aum"),
+        IndexModel([("created_at", DESCENDING), ("investor_id", DESCENDING)], name="created_at_investor_id"),
+        IndexModel([("pan", ASCENDING)], name="pan"),
+        IndexModel([("email", ASCENDING)], name="email"),
+        IndexModel([("search_grams", ASCENDING)], name="search_grams"),
+        IndexModel([("search_tokens", ASCENDING)], name="search_tokens"),
+    ],
+    "analyses": [
+        IndexModel([("analysis_id", ASCENDING)], name="analysis_id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        IndexModel([("cache_key", ASCENDING), ("created_at", DESCENDING)], name="cache_key_created_at"),
+    ],
+    "transactions": [
+        IndexModel([("transaction_id", ASCENDING)], name="transaction_id_unique", unique=True),
+        # transaction_id breaks date ties so keyset pages are stable
+        IndexModel([("investor_id", ASCENDING), ("date", ASCENDING), ("transaction_id", ASCENDING)], name="investor_date"),
+        IndexModel([("folio_id", ASCENDING), ("date", ASCENDING), ("transaction_id", ASCENDING)], name="folio_date"),
+        IndexModel([("holdings_applied", ASCENDING)], name="holdings_pending", partialFilterExpression={"holdings_applied": False}),
+    ],
+    "holdings": [
+        IndexModel([("investor_id", ASCENDING), ("folio_id", ASCENDING), ("scheme", ASCENDING)], name="investor_folio_scheme_unique", unique=True),
+    ],
+    "import_jobs": [
+        IndexModel([("job_id", ASCENDING)], name="job_id_unique", unique=True),
+        IndexModel([("status", ASCENDING)], name="status"),
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+    ],
+    "settings": [
+        IndexModel([("type", ASCENDING)], name="type_unique", unique=True),
+    ],
+}
+
+# Query shapes issued by the routes; each one must be served by an index.
+QUERY_SHAPES = [
+    {"route": "signup/login", "collection": "users", "filter": {"email": "probe@example.com"}},
+    {"route": "get_current_user", "collection": "users", "filter": {"id": "probe"}},
+    {"route": "get/update/delete_investor", "collection": "investors", "filter": {"investor_id": "probe"}},
+    {"route": "run_analysis", "collection": "investors", "filter": {"investor_id": {"$in": ["probe"]}}},
+    {"route": "run_analysis selection state", "collection": "investors",
+     "filter": {"state": "Maharashtra", "risk_profile": "High"}},
+    {"route": "run_analysis selection aum", "collection": "investors", "filter": {"amt_aum": {"$gte": 1000000}}},
+    {"route": "get_investors kyc_status", "collection": "investors", "filter": {"kyc_status": "N"}},
+    {"route": "get_investors risk_profile", "collection": "investors", "filter": {"risk_profile": "High"}},
+    {"route": "get_investors city", "collection": "investors", "filter": {"city": "Mumbai"}},
+    {"route": "get_investors all filters", "collection": "investors",
+     "filter": {"kyc_status": "N", "risk_profile": "High", "city": "Mumbai"}},
+    {"route": "list_investor_page", "collection": "investors", "filter": {},
+     "sort": {"created_at": -1, "investor_id": -1}, "limit": 101},
+    {"route": "get_investors search", "collection": "investors", "filter": {"search_grams": {"$all": ["sharma"]}}},
+    {"route": "get_investors exact search", "collection": "investors", "filter": {"search_tokens": "abcde1234f"}},
+    {"route": "import upsert match", "collection": "investors",
+     "filter": {"$or": [{"pan": {"$in": ["ABCDE1234F"]}}, {"email": {"$in": ["probe@example.com"]}}]}},
+    {"route": "download_analysis_pdf", "collection": "analyses", "filter": {"analysis_id": "probe"}},
+    {"route": "run_analysis memo lookup", "collection": "analyses",
+     "filter": {"cache_key": "probe", "created_at": {"$gte": datetime(2024, 1, 1, tzinfo=timezone.utc)}}, "sort": {"created_at": -1}},
+    {"route": "get_analysis_history", "collection": "analyses", "filter": {}, "sort": {"created_at": -1}, "limit": 50},
+    {"route": "download_report_bundle", "collection": "analyses", "filter": {"analysis_id": {"$in": ["probe"]}},
+     "sort": {"created_at": -1}},
+    {"route": "feature_flags", "collection": "settings", "filter": {"type": "feature_flags"}},
+    {"route": "list_transactions investor", "collection": "transactions",
+     "filter": {"investor_id": "probe", "date": {"$gte": "2024-01-01", "$lte": "2024-12-31"}},
+     "sort": {"date": -1, "transaction_id": -1}, "limit": 101},
+    {"route": "list_transactions folio", "collection": "transactions",
+     "filter": {"folio_id": "probe", "date": {"$gte": "2024-01-01"}},
+     "sort": {"date": -1, "transaction_id": -1}, "limit": 101},
+    {"route": "get_investor_holdings", "collection": "holdings", "filter": {"investor_id": "probe"}},
+    {"route": "fold_pending_holdings", "collection": "transactions", "filter": {"holdings_applied": False}},
+]
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    # create_indexes is a no-op for indexes that already exist with the same spec
+    created = {}
+    for collection, indexes in INDEX_SPECS.items():
+        try:
+            created[collection] = await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            # Usually duplicate data blocking a unique index; keep serving and surface it in the log
+            logger.error(f"Index creation failed for {collection}: {e}")
+            created[collection] = []
+    return created
+
+def _plan_stages(plan) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+async def explain_query_shapes() -> List[dict]:
+    report = []
+    for shape in QUERY_SHAPES:
+        find_cmd = {"find": shape["collection"], "filter": shape["filter"]}
+        if "sort" in shape:
+            find_cmd["sort"] = shape["sort"]
+        if "limit" in shape:
+            find_cmd["limit"] = shape["limit"]
+        explain = await db.command({"explain": find_cmd, "verbosity": "queryPlanner"})
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        report.append({
+            "route": shape["route"],
+            "collection": shape["collection"],
+            "filter": shape["filter"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return report
+
+# Datetime storage
+# Timestamps used to be written as ISO strings. backfill_datetimes() converts any that remain
+# to BSON dates and runs in the background at startup; until it finishes, range filters and
+# sorts on these fields skip string values and readers coerce them with as_datetime().
+_datetime_backfill_task: Optional[asyncio.Task] = None
+DATETIME_FIELDS = {
+    "users": ("created_at",),
+    "investors": ("created_at", "updated_at"),
+    "analyses": ("created_at",),
+    "transactions": ("created_at",),
+    "holdings": ("updated_at",),
+    "import_jobs": ("created_at", "heartbeat_at", "started_at", "finished_at"),
+    "settings": ("reconciled_at",),
+}
+
+def as_datetime(value) -> datetime:
+    # Rows backfill_datetimes has not reached yet still hold ISO strings
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+async def backfill_datetimes(batch_size: int = 1000) -> Dict[str, int]:
+    converted = {}
+    for collection, fields in DATETIME_FIELDS.items():
+        query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        projection = {"_id": 1, **{field: 1 for field in fields}}
+        converted[collection] = 0
+        batch = []
+        async for doc in db[collection].find(query, projection).batch_size(batch_size):
+            changes = {
+                field: datetime.fromisoformat(doc[field])
+                for field in fields if isinstance(doc.get(field), str)
+            }
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+            if len(batch) >= batch_size:
+                converted[collection] += (await db[collection].bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            converted[collection] += (await db[collection].bulk_write(batch, ordered=False)).modified_count
+    return converted
+
+# Dashboard statistics
+# Totals live in one counters document that every investor/analysis write path adjusts with
+# $inc; a periodic full recount corrects any drift (e.g. increments lost to a crash).
+DASHBOARD_STATS_KEY = {"type": "dashboard_stats"}
+_dashboard_reconciler_task: Optional[asyncio.Task] = None
+
+def investor_stats(doc: dict) -> dict:
+    return {
+        "total_investors": 1,
+        "kyc_pending": 1 if doc.get("kyc_status") == "N" else 0,
+        "total_aum": doc.get("amt_aum") or 0
+    }
+
+def sum_investor_stats(docs, sign: int = 1) -> dict:
+    totals = {"total_investors": 0, "kyc_pending": 0, "total_aum": 0}
+    for doc in docs:
+        for key, value in investor_stats(doc).items():
+            totals[key] += sign * value
+    return totals
+
+def investor_stats_change(before: dict, after: dict) -> dict:
+    old, new = investor_stats(before), investor_stats(after)
+    return {key: new[key] - old[key] for key in new}
+
+async def apply_dashboard_delta(delta: dict):
+    delta = {key: value for key, value in delta.items() if value}
+    if delta:
+        await db.settings.update_one(DASHBOARD_STATS_KEY, {"$inc": delta}, upsert=True)
+
+async def record_investor_write(delta: Optional[dict] = None):
+    # Every investor write path funnels through here so derived data stays consistent;
+    # investors_version is the change marker behind the investor list ETag
+    facets_cache.clear()
+    await apply_dashboard_delta({**(delta or {}), "investors_version": 1})
+
+async def reconcile_dashboard_stats() -> dict:
+    pipeline = [
+        {"$group": {
+            "_id": None,
+            "total_investors": {"$sum": 1},
+            "kyc_pending": {"$sum": {"$cond": [{"$eq": ["$kyc_status", "N"]}, 1, 0]}},
+            "total_aum": {"$sum": "$amt_aum"}
+        }}
+    ]
+    result = await db.investors.aggregate(pipeline).to_list(1)
+    totals = result[0] if result else {"total_investors": 0, "kyc_pending": 0, "total_aum": 0}
+    stats = {
+        "total_investors": totals["total_investors"],
+        "kyc_pending": totals["kyc_pending"],
+        "total_aum": totals["total_aum"],
+        "analyses_count": await db.analyses.count_documents({}),
+        "reconciled_at": datetime.now(timezone.utc)
+    }
+    await db.settings.update_one(DASHBOARD_STATS_KEY, {"$set": stats}, upsert=True)
+    return stats
+
+async def dashboard_stats_reconciler():
+    while True:
+        try:
+            await reconcile_dashboard_stats()
+        except Exception as e:
+            logger.error(f"Dashboard stats reconciliation failed: {e}")
+        await asyncio.sleep(DASHBOARD_RECONCILE_SECONDS)
+
+# Investor facets
+# Counts and AUM per filter dimension in a single $facet pass, cached per filter set for
+# FACETS_CACHE_TTL_SECONDS and dropped on any local investor write.
+FACET_DIMENSIONS = ("kyc_status", "risk_profile", "city")
+facets_cache = TTLLRUCache(FACETS_CACHE_MAX_ENTRIES, FACETS_CACHE_TTL_SECONDS)
+
+async def compute_investor_facets(query: dict) -> dict:
+    bucket = [
+        {"$group": {"_id": None, "count": {"$sum": 1}, "total_aum": {"$sum": "$amt_aum"}}}
+    ]
+    facets = {"total": bucket}
+    for dimension in FACET_DIMENSIONS:
+        facets[dimension] = [
+            {"$group": {"_id": f"${dimension}", "count": {"$sum": 1}, "total_aum": {"$sum": "$amt_aum"}}},
+            {"$sort": {"count": -1, "_id": 1}}
+        ]
+    pipeline = [
+        {"$match": query},
+        {"$project": {"_id": 0, "amt_aum": 1, **{dimension: 1 for dimension in FACET_DIMENSIONS}}},
+        {"$facet": facets}
+    ]
+    result = (await db.investors.aggregate(pipeline).to_list(1))[0]
+    total = result["total"][0] if result["total"] else {"count": 0, "total_aum": 0}
+    response = {"total": {"count": total["count"], "total_aum": total["total_aum"]}}
+    for dimension in FACET_DIMENSIONS:
+        response[dimension] = [
+            {"value": entry["_id"], "count": entry["count"], "total_aum": entry["total_aum"]}
+            for entry in result[dimension]
+        ]
+    return response
+
+# Synthetic data generator
+# Load-test data is a pure function of (seed, sizes): chunk k of each collection is drawn from
+# its own RNG seeded with (seed, collection, k) and ids are uuid5s of the row index, so any
+# worker count produces identical documents and re-running a spec duplicates nothing.
+# Chunks are generated in worker processes and written with large unordered insert_many
+# calls; on a reset load the collections are dropped first and indexes built once at the end.
+# Generated transactions carry no holdings_applied flag, so a final rebuild_holdings() folds
+# them all into holdings and moves their investors' amt_aum onto the ledger totals.
+SYNTHETIC_CITIES = (
+    # (city, state, weight) - roughly where mutual fund folios are concentrated
+    ("Mumbai", "Maharashtra", 18), ("Delhi", "Delhi", 14), ("Bangalore", "Karnataka", 11),
+    ("Pune", "Maharashtra", 8), ("Chennai", "Tamil Nadu", 7), ("Hyderabad", "Telangana", 7),
+    ("Kolkata", "West Bengal", 6), ("Ahmedabad", "Gujarat", 6), ("Surat", "Gujarat", 3),
+    ("Jaipur", "Rajasthan", 3), ("Lucknow", "Uttar Pradesh", 3), ("Chandigarh", "Chandigarh", 2),
+    ("Kochi", "Kerala", 2), ("Indore", "Madhya Pradesh", 2), ("Nagpur", "Maharashtra", 2),
+    ("Coimbatore", "Tamil Nadu", 2), ("Vadodara", "Gujarat", 2), ("Bhubaneswar", "Odisha", 1),
+    ("Patna", "Bihar", 1), ("Guwahati", "Assam", 1),
+)
+SYNTHETIC_RISK_PROFILES = (("Medium", 45), ("Low", 28), ("High", 22), ("Unknown", 5))
+SYNTHETIC_FIRST_NAMES = (
+    "Amit", "Priya", "Rahul", "Sneha", "Vijay", "Anjali", "Sanjay", "Pooja", "Rajesh", "Kavita",
+    "Arjun", "Divya", "Karan", "Meera", "Nikhil", "Neha", "Suresh", "Lakshmi", "Rohan", "Ananya",
+    "Deepak", "Swati", "Manoj", "Ritu", "Vikram", "Shreya", "Arun", "Nandini", "Harish", "Isha",
+)
+SYNTHETIC_LAST_NAMES = (
+    "Sharma", "Patel", "Kumar", "Singh", "Reddy", "Gupta", "Joshi", "Mehta", "Nair", "Desai",
+    "Iyer", "Rao", "Shah", "Verma", "Agarwal", "Banerjee", "Chopra", "Das", "Kulkarni", "Menon",
+)
+SYNTHETIC_SCHEMES = (
+    "Bluechip Equity Fund", "Flexi Cap Fund", "Midcap Opportunities Fund", "Small Cap Fund",
+    "ELSS Tax Saver Fund", "Balanced Advantage Fund", "Liquid Fund", "Short Duration Debt Fund",
+    "Corporate Bond Fund", "Nifty 50 Index Fund", "Gilt Fund", "Multi Asset Allocation Fund",
+)
+# SIPs dominate real ledgers; outflows are a minority
+SYNTHETIC_TRANSACTION_TYPES = (
+    ("sip", 55), ("purchase", 18), ("redemption", 10), ("switch_in", 5), ("switch_out", 5),
+    ("dividend_reinvestment", 4), ("swp", 3),
+)
+# Fixed so the same seed gives the same timestamps on every run
+SYNTHETIC_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+SYNTHETIC_HISTORY_DAYS = 5 * 365
+SYNTHETIC_JOB_KEY = {"type": "synthetic_data_job"}
+
+class SyntheticDataSpec(BaseModel):
+    seed: int = 0
+    investors: int = Field(SEED_DEFAULT_INVESTORS, ge=0)
+    transactions: int = Field(0, ge=0)
+    # Drop investors/transactions/holdings first and build indexes after the load
+    reset: bool = True
+    workers: int = Field(SEED_WORKERS, ge=0, le=64)  # 0 generates in the thread pool
+    batch_size: int = Field(SEED_BATCH_SIZE, ge=1)
+
+    @model_validator(mode="after")
+    def check_investors(self):
+        if self.transactions and not self.investors:
+            raise ValueError("transactions need at least one investor to belong to")
+        return self
+
+def synthetic_namespace(seed: int) -> uuid.UUID:
+    return uuid.uuid5(uuid.NAMESPACE_URL, f"drmf-synthetic/{seed}")
+
+def synthetic_rng(seed: int, collection: str, chunk: int) -> np.random.Generator:
+    return np.random.default_rng([seed, zlib.crc32(collection.encode()), chunk])
+
+def _weighted(rng: np.random.Generator, choices: tuple, size: int) -> np.ndarray:
+    weights = np.array([weight for *_, weight in choices], dtype=float)
+    return rng.choice(len(choices), size=size, p=weights / weights.sum())
+
+def synthetic_investor_id(namespace: uuid.UUID, index: int) -> str:
+    return str(uuid.uuid5(namespace, f"investor/{index}"))
+
+def synthetic_folio_ids(index: int) -> List[str]:
+    # A pure function of the index, so transaction chunks can pick a folio without a lookup
+    count = 1 + ((index * 2654435761) & 0xFFFFFFFF) % 4
+    return [f"FOL{index:09d}{k}" for k in range(count)]
+
+def generate_synthetic_investors(seed: int, chunk: int, start: int, count: int) -> List[dict]:
+    # Runs in a seed worker process
+    rng = synthetic_rng(seed, "investors", chunk)
+    namespace = synthetic_namespace(seed)
+    cities = _weighted(rng, SYNTHETIC_CITIES, count)
+    risks = _weighted(rng, SYNTHETIC_RISK_PROFILES, count)
+    first = rng.integers(0, len(SYNTHETIC_FIRST_NAMES), count)
+    last = rng.integers(0, len(SYNTHETIC_LAST_NAMES), count)
+    kyc_pending = rng.random(count) < 0.12
+    # Log-normal around a ~8L median, clipped to 10k-50cr
+    aum = np.clip(rng.lognormal(mean=13.6, sigma=1.3, size=count), 10_000, 500_000_000).round(2)
+    pan_letters = rng.integers(65, 91, (count, 6))
+    pan_digits = rng.integers(1000, 10000, count)
+    arns = rng.integers(100000, 1000000, count)
+    phones = rng.integers(7000000000, 10000000000, count)
+    pincodes = rng.integers(110001, 860000, count)
+    birth_days = rng.integers(0, 40 * 365, count)
+    created_offsets = rng.integers(0, SYNTHETIC_HISTORY_DAYS * 86400, count)
+    contacts = rng.choice(np.array(["email", "phone", "whatsapp"]), count, p=[0.5, 0.3, 0.2])
+    docs = []
+    for i in range(count):
+        index = start + i
+        city, state, _ = SYNTHETIC_CITIES[cities[i]]
+        first_name, last_name = SYNTHETIC_FIRST_NAMES[first[i]], SYNTHETIC_LAST_NAMES[last[i]]
+        letters = "".join(map(chr, pan_letters[i]))
+        created_at = SYNTHETIC_EPOCH - timedelta(seconds=int(created_offsets[i]))
         investor = {
-            "investor_id": str(uuid.uuid4()),
-            "arn": f"ARN-{random.randint(100000, 999999)}",
-            "first_name": random.choice(first_names),
-            "last_name": random.choice(last_names),
-            "email": f"investor{i+1}@example.com",
-            "phone": f"+91{random.randint(7000000000, 9999999999)}",
-            "dob": f"{random.randint(1960, 2000)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
-            "kyc_status": random.choice(["Y", "Y", "Y", "N"]),
-            "pan": f"{chr(random.randint(65, 90))}{chr(random.randint(65, 90))}{chr(random.randint(65, 90))}{chr(random.randint(65, 90))}{chr(random.randint(65, 90))}{random.randint(1000, 9999)}{chr(random.randint(65, 90))}",
-            "address": f"{random.randint(1, 999)} MG Road",
+            "investor_id": synthetic_investor_id(namespace, index),
+            "arn": f"ARN-{arns[i]}",
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": f"{first_name}.{last_name}.{index}@example.com".lower(),
+            "phone": f"+91{phones[i]}",
+            "dob": (datetime(1965, 1, 1) + timedelta(days=int(birth_days[i]))).date().isoformat(),
+            "kyc_status": "N" if kyc_pending[i] else "Y",
+            "pan": f"{letters[:5]}{pan_digits[i]}{letters[5]}",
+            "address": f"{index % 997 + 1} MG Road",
             "city": city,
             "state": state,
-            "pincode": f"{random.randint(100000, 999999)}",
-            "folio_ids": [f"FOL{random.randint(10000, 99999)}" for _ in range(random.randint(1, 4))],
-            "risk_profile": random.choice(["Low", "Medium", "High", "Unknown"]),
-            "amt_aum": round(random.uniform(50000, 5000000), 2),
-            "preferred_contact": random.choice(["email", "phone", "whatsapp"]),
-            "notes": f"Client since {random.randint(2015, 2023)}",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "pincode": str(pincodes[i]),
+            "folio_ids": synthetic_folio_ids(index),
+            "risk_profile": SYNTHETIC_RISK_PROFILES[risks[i]][0],
+            "amt_aum": float(aum[i]),
+            "preferred_contact": str(contacts[i]),
+            "notes": f"Client since {created_at.year}",
+            "version": 0,
+            "created_at": created_at,
+            "updated_at": created_at
         }
-        investors_data.append(investor)
-    
-    if investors_data:
-        await db.investors.insert_many(investors_data)
+        investor.update(build_search_fields(investor))
+        docs.append(investor)
+    return docs
+
+def generate_synthetic_transactions(seed: int, chunk: int, start: int, count: int, investor_total: int) -> List[dict]:
+    # Runs in a seed worker process
+    rng = synthetic_rng(seed, "transactions", chunk)
+    namespace = synthetic_namespace(seed)
+    owners = rng.integers(0, investor_total, count)
+    folio_picks = rng.integers(0, 4, count)
+    schemes = rng.integers(0, len(SYNTHETIC_SCHEMES), count)
+    types = _weighted(rng, SYNTHETIC_TRANSACTION_TYPES, count)
+    # SIP-sized amounts (~5k median) with a long tail of lump sums
+    amounts = np.clip(rng.lognormal(mean=8.5, sigma=1.2, size=count), 500, 10_000_000).round(2)
+    day_offsets = rng.integers(0, SYNTHETIC_HISTORY_DAYS, count)
+    docs = []
+    for i in range(count):
+        owner = int(owners[i])
+        folios = synthetic_folio_ids(owner)
+        docs.append({
+            "transaction_id": str(uuid.uuid5(namespace, f"transaction/{start + i}")),
+            "investor_id": synthetic_investor_id(namespace, owner),
+            "date": (SYNTHETIC_EPOCH - timedelta(days=int(day_offsets[i]))).date().isoformat(),
+            "folio_id": folios[folio_picks[i] % len(folios)],
+            "scheme": SYNTHETIC_SCHEMES[schemes[i]],
+            "type": SYNTHETIC_TRANSACTION_TYPES[types[i]][0],
+            "amount": float(amounts[i]),
+            "created_at": SYNTHETIC_EPOCH
+        })
+    return docs
+
+async def insert_synthetic_batch(collection: str, docs: List[dict]) -> tuple:
+    # Returns (inserted, duplicates); duplicates are rows an earlier run of the same seed wrote
+    try:
+        await db[collection].insert_many(docs, ordered=False)
+        return len(docs), 0
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        failures = [err for err in write_errors if err.get("code") != 11000]
+        if failures:
+            raise
+        return e.details.get("nInserted", 0), len(write_errors)
+
+async def load_synthetic_collection(collection: str, generator, total: int, spec: SyntheticDataSpec, executor, extra_args=(), on_progress=None) -> dict:
+    loop = asyncio.get_running_loop()
+    counts = {"inserted": 0, "duplicates": 0}
+    # Enough chunks in flight to keep every worker busy while earlier batches are written
+    max_inflight = max(2, spec.workers * 2)
+
+    async def load_chunk(chunk: int, start: int):
+        count = min(spec.batch_size, total - start)
+        docs = await loop.run_in_executor(executor, generator, spec.seed, chunk, start, count, *extra_args)
+        inserted, duplicates = await insert_synthetic_batch(collection, docs)
+        counts["inserted"] += inserted
+        counts["duplicates"] += duplicates
+
+    pending = set()
+    try:
+        for chunk, start in enumerate(range(0, total, spec.batch_size)):
+            if len(pending) >= max_inflight:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+                if on_progress:
+                    await on_progress(collection, counts)
+            pending.add(asyncio.ensure_future(load_chunk(chunk, start)))
+        for task in asyncio.as_completed(pending):
+            await task
+        pending = set()
+        if on_progress:
+            await on_progress(collection, counts)
+    finally:
+        for task in pending:
+            task.cancel()
+    return counts
+
+async def generate_synthetic_data(spec: SyntheticDataSpec, on_progress=None) -> dict:
+    started = time.perf_counter()
+    if spec.reset:
+        # Dropping also drops the secondary indexes, so the load only maintains _id
+        for collection in ("investors", "transactions", "holdings"):
+            await db[collection].drop()
+    executor = ProcessPoolExecutor(max_workers=spec.workers) if spec.workers > 0 else None
+    try:
+        result = {
+            "investors": await load_synthetic_collection(
+                "investors", generate_synthetic_investors, spec.investors, spec, executor, on_progress=on_progress
+            ),
+            "transactions": await load_synthetic_collection(
+                "transactions", generate_synthetic_transactions, spec.transactions, spec, executor,
+                extra_args=(spec.investors,), on_progress=on_progress
+            ),
+        }
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    load_seconds = time.perf_counter() - started
+    if spec.reset:
+        await ensure_indexes()
+    if spec.transactions:
+        # Also records the write and reconciles the dashboard counters
+        result["holdings"] = await rebuild_holdings(batch_size=spec.batch_size)
+    else:
+        await record_investor_write()
+        await reconcile_dashboard_stats()
+    result["load_seconds"] = round(load_seconds, 2)
+    result["total_seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+# Only one synthetic load runs at a time across workers; its state lives in the settings collection
+_synthetic_data_task: Optional[asyncio.Task] = None
+
+async def claim_synthetic_data_job(spec: SyntheticDataSpec) -> Optional[dict]:
+    now = datetime.now(timezone.utc)
+    stale = now - timedelta(seconds=SEED_JOB_LEASE_SECONDS)
+    job = {
+        "job_id": str(uuid.uuid4()),
+        "status": "running",
+        "spec": spec.model_dump(),
+        "owner": WORKER_ID,
+        "progress": {},
+        "result": None,
+        "failure": None,
+        "started_at": now,
+        "heartbeat_at": now,
+        "finished_at": None
+    }
+    try:
+        # The unique type index turns a concurrent claim of a live job into a duplicate key error
+        await db.settings.update_one(
+            {**SYNTHETIC_JOB_KEY, "$or": [{"status": {"$ne": "running"}}, {"heartbeat_at": {"$lt": stale}}]},
+            {"$set": job},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return None
+    return job
+
+async def run_synthetic_data_job(job: dict, spec: SyntheticDataSpec):
+    job_filter = {**SYNTHETIC_JOB_KEY, "job_id": job["job_id"]}
+
+    async def progress(collection: str, counts: dict):
+        await db.settings.update_one(job_filter, {"$set": {
+            f"progress.{collection}": dict(counts),
+            "heartbeat_at": datetime.now(timezone.utc)
+        }})
+
+    try:
+        result = await generate_synthetic_data(spec, on_progress=progress)
+        update = {"status": "completed", "result": result}
+        logger.info(f"Synthetic data job {job['job_id']} finished: {result}")
+    except Exception as e:
+        logger.error(f"Synthetic data job {job['job_id']} failed: {e}", exc_info=True)
+        update = {"status": "failed", "failure": str(e)}
+    await db.settings.update_one(job_filter, {"$set": {**update, "finished_at": datetime.now(timezone.utc)}})
+    return update
+
+async def start_synthetic_data_job(spec: SyntheticDataSpec) -> Optional[dict]:
+    global _synthetic_data_task
+    job = await claim_synthetic_data_job(spec)
+    if job:
+        _synthetic_data_task = asyncio.create_task(run_synthetic_data_job(job, spec))
+    return job
 
 # Authentication Routes
 @api_router.post("/auth/signup")
@@ -253,8 +1316,8 @@ async def signup(user_data: UserCreate):
         logger.warning(f"Signup failed: Email {user_data.email} already registered")
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    hashed_password = await hash_password_async(user_data.password)
     try:
-        hashed_password = hash_password(user_data.password)
         user = User(
             email=user_data.email,
             full_name=user_data.full_name,
@@ -262,12 +1325,9 @@ async def signup(user_data: UserCreate):
         )
         
         user_dict = user.model_dump()
-        user_dict["created_at"] = user_dict["created_at"].isoformat()
         
         await db.users.insert_one(user_dict)
         
-        await generate_seed_investors()
-        
         token = create_access_token({"sub": user.id})
         logger.info(f"User {user.email} signed up successfully.")
         return {"user": user, "token": token}
@@ -281,7 +1341,7 @@ async def login(credentials: UserLogin):
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    if not verify_password(credentials.password, user["hashed_password"]):
+    if not await verify_password_async(credentials.password, user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     user_obj = User(**user)
@@ -310,94 +1370,387 @@ async def reset_password(data: PasswordResetConfirm):
     logger.info(f"Password reset attempted with token: {data.token}")
     return {"message": "Password has been reset successfully (mock)"}
 
+# Conditional investor requests
+# A single investor's ETag is its version; list responses share one ETag built from the
+# investors_version change marker that record_investor_write bumps, so a revalidation is
+# one settings read and a 304 never touches the investors collection.
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+    return "*" in candidates or f'"{etag}"' in candidates
+
+def investor_etag(doc: dict) -> str:
+    return f"v{doc.get('version', 0)}"
+
+def http_date(value: datetime) -> str:
+    return format_datetime(as_datetime(value).astimezone(timezone.utc), usegmt=True)
+
+def investor_not_modified(if_none_match: Optional[str], if_modified_since: Optional[str], etag: str, last_modified: Optional[datetime]) -> bool:
+    # If-None-Match wins when both are sent (RFC 9110 13.2.2)
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return as_datetime(last_modified).replace(microsecond=0) <= since
+    return False
+
+def version_precondition(if_match: str) -> Optional[dict]:
+    # Filter for the versions an If-Match header accepts; None for "*" (any existing investor)
+    versions = []
+    for value in if_match.split(","):
+        value = value.strip()
+        if value == "*":
+            return None
+        # Weak tags never satisfy If-Match
+        if value.startswith('"v') and value.endswith('"') and value[2:-1].isdigit():
+            versions.append(int(value[2:-1]))
+    if 0 in versions:
+        versions.append(None)  # investors written before versioning
+    return {"version": {"$in": versions}}
+
+async def investors_change_marker() -> int:
+    doc = await db.settings.find_one(DASHBOARD_STATS_KEY, {"_id": 0, "investors_version": 1})
+    return (doc or {}).get("investors_version", 0)
+
+def investor_list_headers(marker: int) -> dict:
+    return {"ETag": f'"investors-{marker}"', "Cache-Control": "private, no-cache"}
+
 # Investor Routes
 @api_router.get("/investors", response_model=List[Investor])
 async def get_investors(
+    response: Response,
     search: Optional[str] = None,
     kyc_status: Optional[str] = None,
     risk_profile: Optional[str] = None,
     city: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
-    query = {}
+    # The marker is read before the data, so a racing write can only make the ETag stale-early
+    headers = investor_list_headers(await investors_change_marker())
+    if _etag_matches(if_none_match, headers["ETag"].strip('"')):
+        return Response(status_code=304, headers=headers)
+    
+    query = build_investor_filters(kyc_status, risk_profile, city)
     
     if search:
-        query["$or"] = [
-            {"first_name": {"$regex": search, "$options": "i"}},
-            {"last_name": {"$regex": search, "$options": "i"}},
-            {"email": {"$regex": search, "$options": "i"}},
-            {"arn": {"$regex": search, "$options": "i"}},
-            {"pan": {"$regex": search, "$options": "i"}}
-        ]
+        investors = await search_investors(search, query, min(limit or SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT))
+    else:
+        # Same order as /investors/page, so a truncated list continues from its Link
+        investors = await db.investors.find(query, INVESTOR_PROJECTION).sort(INVESTOR_LIST_SORT).limit(INVESTOR_LIST_MAX + 1).to_list(INVESTOR_LIST_MAX + 1)
+        if len(investors) > INVESTOR_LIST_MAX:
+            investors = investors[:INVESTOR_LIST_MAX]
+            params = {"kyc_status": kyc_status, "risk_profile": risk_profile, "city": city}
+            params = {key: value for key, value in params.items() if value}
+            params["cursor"] = encode_investor_cursor(investors[-1])
+            headers = {
+                **headers,
+                "X-Truncated": "true",
+                "Link": f'</api/investors/page?{urlencode(params)}>; rel="next"'
+            }
     
-    if kyc_status:
-        query["kyc_status"] = kyc_status
-    if risk_profile:
-        query["risk_profile"] = risk_profile
-    if city:
-        query["city"] = city
+    if (await current_feature_flags()).fast_json_responses:
+        return FastJSONResponse(investors, headers=headers)
+    response.headers.update(headers)
+    return investors
+
+@api_router.get("/investors/page", response_model=InvestorPage)
+async def list_investor_page(
+    response: Response,
+    cursor: Optional[str] = None,
+    page_size: int = Query(INVESTOR_PAGE_SIZE, ge=1, le=INVESTOR_MAX_PAGE_SIZE),
+    kyc_status: Optional[str] = None,
+    risk_profile: Optional[str] = None,
+    city: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    headers = investor_list_headers(await investors_change_marker())
+    if _etag_matches(if_none_match, headers["ETag"].strip('"')):
+        return Response(status_code=304, headers=headers)
     
-    investors = await db.investors.find(query, {"_id": 0}).to_list(1000)
+    query = build_investor_filters(kyc_status, risk_profile, city)
+    if cursor:
+        query = {"$and": [query, decode_investor_cursor(cursor)]} if query else decode_investor_cursor(cursor)
     
-    for investor in investors:
-        if isinstance(investor.get('created_at'), str):
-            investor['created_at'] = datetime.fromisoformat(investor['created_at'])
-        if isinstance(investor.get('updated_at'), str):
-            investor['updated_at'] = datetime.fromisoformat(investor['updated_at'])
+    # One extra row tells us whether another page exists without a count
+    investors = await db.investors.find(query, INVESTOR_PROJECTION).sort(INVESTOR_LIST_SORT).limit(page_size + 1).to_list(page_size + 1)
+    next_cursor = None
+    if len(investors) > page_size:
+        investors = investors[:page_size]
+        next_cursor = encode_investor_cursor(investors[-1])
     
-    return investors
+    if (await current_feature_flags()).fast_json_responses:
+        return FastJSONResponse({"items": investors, "next_cursor": next_cursor}, headers=headers)
+    response.headers.update(headers)
+    return {"items": investors, "next_cursor": next_cursor}
+
+@api_router.get("/investors/stream")
+async def stream_investors(
+    format: str = Query("ndjson", pattern="^(ndjson|json)$"),
+    kyc_status: Optional[str] = None,
+    risk_profile: Optional[str] = None,
+    city: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = build_investor_filters(kyc_status, risk_profile, city)
+    if format == "json":
+        return StreamingResponse(stream_investors_json_array(query, INVESTOR_PROJECTION), media_type="application/json")
+    return StreamingResponse(stream_investors_ndjson(query, INVESTOR_PROJECTION), media_type="application/x-ndjson")
+
+@api_router.get("/investors/export")
+async def export_investors(
+    format: str = Query("csv", pattern="^(csv|ndjson|columnar)$"),
+    fields: Optional[str] = None,
+    search: Optional[str] = None,
+    kyc_status: Optional[str] = None,
+    risk_profile: Optional[str] = None,
+    city: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    selected = parse_export_fields(fields)
+    query = build_investor_filters(kyc_status, risk_profile, city)
+    if search:
+        terms = _search_terms(search)
+        if terms:
+            query.update(search_grams_filter(terms))
+    
+    media_type, extension = EXPORT_MEDIA_TYPES[format]
+    filename = f"investors_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}.{extension}"
+    return StreamingResponse(
+        EXPORT_WRITERS[format](query, selected),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+# Bulk investor mutations
+# A target (ids or a selection filter) is resolved with one read that also yields the
+# pre-images for the dashboard delta and per-item results; the write is then one
+# update_many, or one unordered bulk_write when search tokens must be rebuilt per investor.
+BULK_PREIMAGE_PROJECTION = {"_id": 0, "investor_id": 1, "kyc_status": 1, "amt_aum": 1, "aum_source": 1, **{field: 1 for field in SEARCH_FIELDS}}
+# Once an investor has holdings, amt_aum is their ledger total and moves only with transactions
+LEDGER_AUM_ERROR = "amt_aum is derived from the transaction ledger for this investor"
+# Guard for writes that $set amt_aum, in case the investor turned ledger-backed since it was read
+NOT_LEDGER_BACKED = {"aum_source": {"$ne": "holdings"}}
+
+def investor_update_fields(update_data: InvestorUpdate) -> dict:
+    update_dict = {k: v for k, v in update_data.model_dump(exclude_unset=True).items() if v is not None}
+    update_dict["updated_at"] = datetime.now(timezone.utc)
+    return update_dict
+
+async def resolve_bulk_target(target: BulkInvestorTarget) -> tuple:
+    # -> (pre-images by investor_id, requested ids that do not exist)
+    if target.investor_ids is not None:
+        requested = list(dict.fromkeys(target.investor_ids))
+        if len(requested) > BULK_MAX_ITEMS:
+            raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ITEMS} investors per request")
+        query = {"investor_id": {"$in": requested}}
+    else:
+        requested = None
+        query = build_selection_query(target.filter)
+    found = {}
+    async for doc in db.investors.find(query, BULK_PREIMAGE_PROJECTION).limit(BULK_MAX_ITEMS + 1):
+        found[doc["investor_id"]] = doc
+    if len(found) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Filter matches more than {BULK_MAX_ITEMS} investors; narrow it")
+    missing = [investor_id for investor_id in requested if investor_id not in found] if requested else []
+    return found, missing
+
+def bulk_results(found: dict, missing: List[str], status_value: str, failed: Optional[dict] = None, conflicts: Optional[dict] = None) -> List[dict]:
+    failed = failed or {}
+    conflicts = conflicts or {}
+    results = [
+        {"investor_id": investor_id, "status": "failed", "error": failed[investor_id]} if investor_id in failed
+        else {"investor_id": investor_id, "status": "conflict", "error": conflicts[investor_id]} if investor_id in conflicts
+        else {"investor_id": investor_id, "status": status_value}
+        for investor_id in found
+    ]
+    results.extend({"investor_id": investor_id, "status": "not_found"} for investor_id in missing)
+    return results
+
+@api_router.post("/investors/bulk-update")
+async def bulk_update_investors(request: BulkInvestorUpdate, current_user: User = Depends(get_current_user)):
+    update_dict = investor_update_fields(request.update)
+    if len(update_dict) == 1:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    found, missing = await resolve_bulk_target(request)
+    failed, guard = {}, {}
+    if "amt_aum" in update_dict:
+        failed = {investor_id: LEDGER_AUM_ERROR for investor_id, doc in found.items() if doc.get("aum_source") == "holdings"}
+        guard = NOT_LEDGER_BACKED
+    writable = {investor_id: doc for investor_id, doc in found.items() if investor_id not in failed}
+    matched = 0
+    if writable and any(field in update_dict for field in SEARCH_FIELDS):
+        ops = [
+            UpdateOne({"investor_id": investor_id, **guard}, {"$set": {**update_dict, **build_search_fields({**doc, **update_dict})}, "$inc": {"version": 1}})
+            for investor_id, doc in writable.items()
+        ]
+        try:
+            matched = (await db.investors.bulk_write(ops, ordered=False)).matched_count
+        except BulkWriteError as e:
+            ids = list(writable)
+            failed.update({ids[err["index"]]: err.get("errmsg", "write failed") for err in e.details.get("writeErrors", [])})
+            matched = e.details.get("nMatched", 0)
+    elif writable:
+        matched = (await db.investors.update_many({"investor_id": {"$in": list(writable)}, **guard}, {"$set": update_dict, "$inc": {"version": 1}})).matched_count
+    
+    # Guard misses: investors deleted, or turned ledger-backed, after they were read above
+    conflicts = {}
+    attempted = [investor_id for investor_id in writable if investor_id not in failed]
+    if matched < len(attempted):
+        still_writable = {
+            doc["investor_id"]
+            async for doc in db.investors.find({"investor_id": {"$in": attempted}, **guard}, {"_id": 0, "investor_id": 1})
+        }
+        conflicts = {
+            investor_id: "Investor was modified by someone else; reload and retry"
+            for investor_id in attempted if investor_id not in still_writable
+        }
+    
+    delta = {"total_investors": 0, "kyc_pending": 0, "total_aum": 0}
+    for investor_id, doc in found.items():
+        if investor_id not in failed and investor_id not in conflicts:
+            for key, value in investor_stats_change(doc, {**doc, **update_dict}).items():
+                delta[key] += value
+    await record_investor_write(delta)
+    return {
+        "matched_count": len(found),
+        "updated_count": len(found) - len(failed) - len(conflicts),
+        "failed_count": len(failed),
+        "conflict_count": len(conflicts),
+        "not_found_count": len(missing),
+        "results": bulk_results(found, missing, "updated", failed, conflicts)
+    }
+
+@api_router.post("/investors/bulk-delete")
+async def bulk_delete_investors(request: BulkInvestorTarget, current_user: User = Depends(get_current_user)):
+    found, missing = await resolve_bulk_target(request)
+    deleted_count = 0
+    if found:
+        result = await db.investors.delete_many({"investor_id": {"$in": list(found)}})
+        deleted_count = result.deleted_count
+    # A concurrent delete can make deleted_count fall short; the reconciler absorbs that drift
+    await record_investor_write(sum_investor_stats(found.values(), sign=-1))
+    return {
+        "matched_count": len(found),
+        "deleted_count": deleted_count,
+        "not_found_count": len(missing),
+        "results": bulk_results(found, missing, "deleted")
+    }
+
+@api_router.get("/investors/facets")
+async def get_investor_facets(
+    search: Optional[str] = None,
+    kyc_status: Optional[str] = None,
+    risk_profile: Optional[str] = None,
+    city: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    query = build_investor_filters(kyc_status, risk_profile, city)
+    terms = _search_terms(search) if search else []
+    if terms:
+        query.update(search_grams_filter(terms))
+    
+    cache_key = json.dumps(query, sort_keys=True)
+    facets = facets_cache.get(cache_key)
+    if facets is None:
+        facets = await compute_investor_facets(query)
+        facets_cache.set(cache_key, facets)
+    return facets
+
+def investor_headers(investor: dict) -> dict:
+    headers = {"ETag": f'"{investor_etag(investor)}"', "Cache-Control": "private, no-cache"}
+    if investor.get("updated_at"):
+        headers["Last-Modified"] = http_date(investor["updated_at"])
+    return headers
 
 @api_router.get("/investors/{investor_id}", response_model=Investor)
-async def get_investor(investor_id: str, current_user: User = Depends(get_current_user)):
-    investor = await db.investors.find_one({"investor_id": investor_id}, {"_id": 0})
+async def get_investor(
+    investor_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    investor = await db.investors.find_one({"investor_id": investor_id}, INVESTOR_PROJECTION)
     if not investor:
         raise HTTPException(status_code=404, detail="Investor not found")
     
-    if isinstance(investor.get('created_at'), str):
-        investor['created_at'] = datetime.fromisoformat(investor['created_at'])
-    if isinstance(investor.get('updated_at'), str):
-        investor['updated_at'] = datetime.fromisoformat(investor['updated_at'])
-    
+    headers = investor_headers(investor)
+    if investor_not_modified(if_none_match, if_modified_since, investor_etag(investor), investor.get("updated_at")):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return Investor(**investor)
 
 @api_router.post("/investors", response_model=Investor)
 async def create_investor(investor_data: InvestorCreate, current_user: User = Depends(get_current_user)):
     investor = Investor(**investor_data.model_dump())
-    investor_dict = investor.model_dump()
-    investor_dict["created_at"] = investor_dict["created_at"].isoformat()
-    investor_dict["updated_at"] = investor_dict["updated_at"].isoformat()
+    investor_dict = investor_to_document(investor)
     
     await db.investors.insert_one(investor_dict)
+    await record_investor_write(investor_stats(investor_dict))
     return investor
 
 @api_router.put("/investors/{investor_id}", response_model=Investor)
 async def update_investor(
     investor_id: str,
     update_data: InvestorUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
-    investor = await db.investors.find_one({"investor_id": investor_id}, {"_id": 0})
-    if not investor:
-        raise HTTPException(status_code=404, detail="Investor not found")
-    
-    update_dict = {k: v for k, v in update_data.model_dump(exclude_unset=True).items() if v is not None}
-    update_dict["updated_at"] = datetime.now(timezone.utc).isoformat()
-    
-    await db.investors.update_one({"investor_id": investor_id}, {"$set": update_dict})
-    
-    updated_investor = await db.investors.find_one({"investor_id": investor_id}, {"_id": 0})
-    if isinstance(updated_investor.get('created_at'), str):
-        updated_investor['created_at'] = datetime.fromisoformat(updated_investor['created_at'])
-    if isinstance(updated_investor.get('updated_at'), str):
-        updated_investor['updated_at'] = datetime.fromisoformat(updated_investor['updated_at'])
+    update_dict = investor_update_fields(update_data)
+    precondition = version_precondition(if_match) if if_match else None
+    # Read, derive the search fields from the merged document, then write everything in one
+    # find_one_and_update guarded on the version that was read, so search never lags the
+    # fields it indexes. A concurrent writer bumps the version and this loop re-reads.
+    for _ in range(INVESTOR_UPDATE_MAX_ATTEMPTS):
+        investor = await db.investors.find_one({"investor_id": investor_id, **(precondition or {})}, {**INVESTOR_PROJECTION, "aum_source": 1})
+        if not investor:
+            if precondition and await db.investors.find_one({"investor_id": investor_id}, {"_id": 1}):
+                raise HTTPException(status_code=412, detail="Investor was modified by someone else; reload and retry")
+            raise HTTPException(status_code=404, detail="Investor not found")
+        changes = dict(update_dict)
+        if "amt_aum" in changes and investor.get("aum_source") == "holdings":
+            # Edit forms send every field back; only a real change is refused
+            if changes["amt_aum"] != investor.get("amt_aum"):
+                raise HTTPException(status_code=409, detail=LEDGER_AUM_ERROR)
+            del changes["amt_aum"]
+        if any(field in changes for field in SEARCH_FIELDS):
+            changes.update(build_search_fields({**investor, **changes}))
+        version = investor.get("version", 0)
+        result = await db.investors.update_one(
+            # Investors written before versioning have no version field
+            {"investor_id": investor_id, "version": version if version else {"$in": [0, None]}},
+            {"$set": changes, "$inc": {"version": 1}}
+        )
+        if result.matched_count:
+            # The guard pins the pre-image, so the stored document is exactly this
+            updated_investor = {**investor, **changes, "version": version + 1}
+            updated_investor = {field: value for field, value in updated_investor.items() if field in INVESTOR_PROJECTION}
+            break
+        if precondition:
+            raise HTTPException(status_code=412, detail="Investor was modified by someone else; reload and retry")
+    else:
+        raise HTTPException(status_code=409, detail="Investor is being modified concurrently; retry")
     
+    await record_investor_write(investor_stats_change(investor, updated_investor))
+    response.headers.update(investor_headers(updated_investor))
     return Investor(**updated_investor)
 
 @api_router.delete("/investors/{investor_id}")
 async def delete_investor(investor_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.investors.delete_one({"investor_id": investor_id})
-    if result.deleted_count == 0:
+    deleted = await db.investors.find_one_and_delete(
+        {"investor_id": investor_id}, projection={"_id": 0, "kyc_status": 1, "amt_aum": 1}
+    )
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Investor not found")
+    await record_investor_write(sum_investor_stats([deleted], sign=-1))
     return {"message": "Investor deleted successfully"}
 
 @api_router.get("/investors/csv-template/download")
@@ -426,68 +1779,1011 @@ async def download_csv_template():
         headers={"Content-Disposition": "attachment; filename=investor_template.csv"}
     )
 
+# CSV import
+def split_text_lines(text: str) -> Tuple[List[str], str]:
+    # Complete lines (keeping their "\n") and the unterminated tail. Only "\n" ends a line:
+    # str.splitlines also breaks on \r, \v, \x1c-\x1e, \x85 and U+2028/9, which values may contain.
+    lines = text.split("\n")
+    tail = lines.pop()
+    return [line + "\n" for line in lines], tail
+
+def iter_text_lines(binary_file, chunk_size: int = IMPORT_CHUNK_SIZE):
+    # Decodes the upload chunk by chunk; only the current chunk and one partial line are held
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        chunk = binary_file.read(chunk_size)
+        text = decoder.decode(chunk, final=not chunk)
+        if text:
+            lines, pending = split_text_lines(pending + text)
+            yield from lines
+        if not chunk:
+            break
+    if pending:
+        yield pending
+
+def csv_row_to_investor(row: dict) -> Investor:
+    folio_ids = [f.strip() for f in (row.get('folio_ids') or '').split(',') if f.strip()]
+    return Investor(
+        arn=row['arn'],
+        first_name=row['first_name'],
+        last_name=row['last_name'],
+        email=row['email'],
+        phone=row['phone'],
+        dob=row['dob'],
+        kyc_status=row['kyc_status'],
+        pan=row['pan'],
+        address=row['address'],
+        city=row['city'],
+        state=row['state'],
+        pincode=row['pincode'],
+        folio_ids=folio_ids,
+        risk_profile=row['risk_profile'],
+        amt_aum=float(row['amt_aum']),
+        preferred_contact=row['preferred_contact'],
+        notes=row.get('notes') or ''
+    )
+
+def read_import_rows(rows, batch_size: int) -> List[tuple]:
+    return list(itertools.islice(rows, batch_size))
+
+def validate_import_rows(numbered_rows: List[tuple], id_namespace: Optional[str] = None):
+    # Runs in an import worker process, so it only takes and returns plain data.
+    # With an id_namespace each row gets a deterministic investor_id, making re-runs idempotent.
+    row_nums, docs, errors = [], [], []
+    for row_num, row in numbered_rows:
+        try:
+            investor = csv_row_to_investor(row)
+            if id_namespace:
+                investor.investor_id = str(uuid.uuid5(uuid.UUID(id_namespace), str(row_num)))
+            docs.append(investor_to_document(investor))
+            row_nums.append(row_num)
+        except Exception as e:
+            errors.append({"row": row_num, "error": str(e)})
+    return row_nums, docs, errors
+
+_import_executor = None
+
+def get_import_executor():
+    global _import_executor
+    if IMPORT_WORKERS > 0 and _import_executor is None:
+        _import_executor = ProcessPoolExecutor(max_workers=IMPORT_WORKERS)
+    return _import_executor
+
+class ImportReport:
+    def __init__(self, max_errors: int = IMPORT_MAX_REPORTED_ERRORS):
+        self.imported_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+        self.error_count = 0
+        self.errors = []
+        self.max_errors = max_errors
+        # Every row up to and including this one has been written (or rejected)
+        self.last_committed_row = 1
+        self.cancelled = False
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ImportReport":
+        report = cls()
+        report.imported_count = data.get("imported_count", 0)
+        report.updated_count = data.get("updated_count", 0)
+        report.unchanged_count = data.get("unchanged_count", 0)
+        report.last_committed_row = data.get("last_committed_row", 1)
+        # A resumed job replays every row after last_committed_row, so only errors inside the
+        # committed prefix are kept, once per row
+        errors = {}
+        for error in data.get("errors", []):
+            if error["row"] <= report.last_committed_row:
+                errors.setdefault(error["row"], error)
+        report.errors = list(errors.values())
+        report.error_count = data.get("error_count", 0) - (len(data.get("errors", [])) - len(report.errors))
+        return report
+
+    def add_errors(self, errors: List[dict]):
+        self.error_count += len(errors)
+        room = self.max_errors - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+    def to_dict(self) -> dict:
+        return {
+            "message": f"Successfully imported {self.imported_count} investors",
+            "imported_count": self.imported_count,
+            "updated_count": self.updated_count,
+            "unchanged_count": self.unchanged_count,
+            "error_count": self.error_count,
+            "errors": sorted(self.errors, key=lambda error: error["row"])
+        }
+
+async def insert_import_batch(row_nums: List[int], docs: List[dict], report: ImportReport, resumable: bool = False):
+    try:
+        result = await db.investors.insert_many(docs, ordered=False)
+        report.imported_count += len(result.inserted_ids)
+        inserted_docs = docs
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        report.imported_count += e.details.get("nInserted", 0)
+        report.add_errors([
+            {"row": row_nums[err["index"]], "error": err.get("errmsg", "write failed")}
+            for err in write_errors
+            # On a resumed job a duplicate investor_id is a row committed before the restart
+            if not (resumable and err.get("code") == 11000)
+        ])
+        failed = {err["index"] for err in write_errors}
+        inserted_docs = [doc for index, doc in enumerate(docs) if index not in failed]
+    await record_investor_write(sum_investor_stats(inserted_docs))
+
+# Upsert mode matches rows to existing investors by PAN, falling back to email
+INVESTOR_DATA_FIELDS = tuple(InvestorCreate.model_fields)
+
+async def upsert_import_batch(row_nums: List[int], docs: List[dict], report: ImportReport):
+    pans = list({doc["pan"] for doc in docs})
+    emails = list({doc["email"] for doc in docs})
+    by_pan, by_email = {}, {}
+    projection = {"_id": 0, "investor_id": 1, "aum_source": 1, **{field: 1 for field in INVESTOR_DATA_FIELDS}}
+    async for existing in db.investors.find({"$or": [{"pan": {"$in": pans}}, {"email": {"$in": emails}}]}, projection):
+        by_pan.setdefault(existing["pan"], existing)
+        by_email.setdefault(existing["email"], existing)
+
+    # One operation per target investor, so the unordered bulk_write has no intra-batch ordering hazards
+    planned: Dict[str, dict] = {}
+    for row_num, doc in zip(row_nums, docs):
+        match = by_pan.get(doc["pan"]) or by_email.get(doc["email"])
+        if match is None:
+            by_pan[doc["pan"]] = by_email[doc["email"]] = doc
+            planned[doc["investor_id"]] = {"row": row_num, "insert": doc}
+            continue
+        target = planned.setdefault(match["investor_id"], {
+            "row": row_num, "set": {}, "current": match,
+            "before": {"kyc_status": match.get("kyc_status"), "amt_aum": match.get("amt_aum")}
+        })
+        changes = {field: doc[field] for field in INVESTOR_DATA_FIELDS if match.get(field) != doc[field]}
+        if match.get("aum_source") == "holdings":
+            # A re-imported book must not overwrite a ledger total with its stale AUM column
+            changes.pop("amt_aum", None)
+        if changes:
+            # match is the insert doc itself for a PAN repeated within the batch
+            match.update(changes)
+            if "set" in target:
+                target["set"].update(changes)
+            target["row"] = row_num
+
+    ops, op_targets = [], []
+    # Inserts first, so bulk_write's upserted indexes line up with the front of op_targets
+    for investor_id, target in sorted(planned.items(), key=lambda item: "insert" not in item[1]):
+        if "insert" in target:
+            doc = target["insert"]
+            doc.update(build_search_fields(doc))
+            ops.append(UpdateOne({"pan": doc["pan"]}, {"$setOnInsert": doc}, upsert=True))
+        elif target["set"]:
+            changes = target["set"]
+            changes["updated_at"] = datetime.now(timezone.utc)
+            if any(field in changes for field in SEARCH_FIELDS):
+                changes.update(build_search_fields(target["current"]))
+            guard = NOT_LEDGER_BACKED if "amt_aum" in changes else {}
+            ops.append(UpdateOne({"investor_id": investor_id, **guard}, {"$set": changes, "$inc": {"version": 1}}))
+        else:
+            continue
+        op_targets.append(target)
+
+    inserted = updated = failed = 0
+    if ops:
+        failed_indexes = set()
+        try:
+            result = await db.investors.bulk_write(ops, ordered=False)
+            inserted, updated = result.upserted_count, result.modified_count
+            upserted_indexes = set(result.upserted_ids)
+        except BulkWriteError as e:
+            inserted, updated = e.details.get("nUpserted", 0), e.details.get("nModified", 0)
+            upserted_indexes = {entry["index"] for entry in e.details.get("upserted", [])}
+            write_errors = e.details.get("writeErrors", [])
+            failed = len(write_errors)
+            failed_indexes = {err["index"] for err in write_errors}
+            report.add_errors([
+                {"row": op_targets[err["index"]]["row"], "error": err.get("errmsg", "write failed")}
+                for err in write_errors
+            ])
+        delta = {"total_investors": 0, "kyc_pending": 0, "total_aum": 0}
+        for index, target in enumerate(op_targets):
+            if index in failed_indexes:
+                continue
+            if "insert" in target:
+                change = investor_stats(target["insert"]) if index in upserted_indexes else {}
+            else:
+                change = investor_stats_change(target["before"], target["current"])
+            for key, value in change.items():
+                delta[key] += value
+        await record_investor_write(delta)
+    report.imported_count += inserted
+    report.updated_count += updated
+    report.unchanged_count += len(docs) - inserted - updated - failed
+
+async def import_investor_rows(
+    binary_file,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    report: Optional[ImportReport] = None,
+    id_namespace: Optional[str] = None,
+    mode: str = "insert",
+    on_checkpoint=None,
+    should_cancel=None
+) -> ImportReport:
+    # Reading happens in a thread, validation in the import workers and writes on the loop;
+    # at most IMPORT_MAX_INFLIGHT_BATCHES batches are held in memory at any time.
+    report = report or ImportReport()
+    rows = enumerate(csv.DictReader(iter_text_lines(binary_file)), start=2)
+    if report.last_committed_row > 1:
+        skip_through = report.last_committed_row
+        rows = itertools.dropwhile(lambda item: item[0] <= skip_through, rows)
+    loop = asyncio.get_running_loop()
+    executor = get_import_executor()
+    pending = {}
+    validated = {}  # batch index -> validation result waiting for its turn to be written
+    batch_ends = []
+    next_to_commit = 0
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) + len(validated) < IMPORT_MAX_INFLIGHT_BATCHES:
+            if should_cancel and await should_cancel():
+                report.cancelled = True
+                exhausted = True
+                break
+            batch = await run_in_threadpool(read_import_rows, rows, batch_size)
+            exhausted = len(batch) < batch_size
+            if batch:
+                future = loop.run_in_executor(executor, validate_import_rows, batch, id_namespace)
+                pending[future] = len(batch_ends)
+                batch_ends.append(batch[-1][0])
+        if not pending:
+            return report
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            validated[pending.pop(future)] = future.result()
+        # Validation finishes out of order but batches are written strictly in file order, so a
+        # later row for a PAN always lands after an earlier one, and the report only ever covers
+        # the committed prefix of the file
+        advanced = False
+        while next_to_commit in validated:
+            row_nums, docs, errors = validated.pop(next_to_commit)
+            report.add_errors(errors)
+            if docs and mode == "upsert":
+                await upsert_import_batch(row_nums, docs, report)
+            elif docs:
+                await insert_import_batch(row_nums, docs, report, resumable=id_namespace is not None)
+            report.last_committed_row = batch_ends[next_to_commit]
+            next_to_commit += 1
+            advanced = True
+        if advanced and on_checkpoint:
+            await on_checkpoint(report)
+
 @api_router.post("/investors/import-csv")
 async def import_csv(
     file: UploadFile = File(...),
+    mode: str = Query("insert", pattern="^(insert|upsert)$"),
     current_user: User = Depends(get_current_user)
 ):
     try:
-        contents = await file.read()
-        decoded = contents.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(decoded))
-        
-        imported_count = 0
-        errors = []
-        
-        for row_num, row in enumerate(csv_reader, start=2):
+        report = await import_investor_rows(file.file, mode=mode)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error processing CSV: {str(e)}")
+    return report.to_dict()
+
+# Background import jobs
+# Uploads are spooled to IMPORT_SPOOL_DIR and processed by a task on whichever worker holds
+# the job's lease. Each committed batch checkpoints last_committed_row; a job whose lease
+# goes stale (worker restart) is picked up again and skips everything already committed.
+# The spool file lives on the uploading host's disk, so unless IMPORT_SPOOL_SHARED is set
+# only a worker on that host may take over a stale lease.
+IMPORT_JOB_ACTIVE_STATUSES = ["queued", "running"]
+IMPORT_JOB_PROJECTION = {"_id": 0, "spool_path": 0, "spool_host": 0, "owner": 0, "id_namespace": 0}
+_import_tasks: Dict[str, asyncio.Task] = {}
+_import_supervisor_task: Optional[asyncio.Task] = None
+
+async def claim_import_job(job_id: str) -> Optional[dict]:
+    stale = datetime.now(timezone.utc) - timedelta(seconds=IMPORT_JOB_LEASE_SECONDS)
+    takeover = {"heartbeat_at": {"$lt": stale}}
+    if not IMPORT_SPOOL_SHARED:
+        # Jobs queued before spool_host was recorded have none
+        takeover["spool_host"] = {"$in": [WORKER_HOST, None]}
+    return await db.import_jobs.find_one_and_update(
+        {
+            "job_id": job_id,
+            "status": {"$in": IMPORT_JOB_ACTIVE_STATUSES},
+            "$or": [{"owner": WORKER_ID}, takeover]
+        },
+        {"$set": {"owner": WORKER_ID, "heartbeat_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def run_import_job(job: dict):
+    job_id = job["job_id"]
+
+    async def checkpoint(report: ImportReport):
+        await db.import_jobs.update_one({"job_id": job_id}, {"$set": {
+            "imported_count": report.imported_count,
+            "updated_count": report.updated_count,
+            "unchanged_count": report.unchanged_count,
+            "error_count": report.error_count,
+            "errors": report.errors,
+            "last_committed_row": report.last_committed_row,
+            "heartbeat_at": datetime.now(timezone.utc)
+        }})
+
+    async def cancel_requested() -> bool:
+        current = await db.import_jobs.find_one({"job_id": job_id}, {"_id": 0, "cancel_requested": 1})
+        return bool(current and current.get("cancel_requested"))
+
+    await db.import_jobs.update_one({"job_id": job_id}, {"$set": {
+        "status": "running",
+        "started_at": job.get("started_at") or datetime.now(timezone.utc)
+    }})
+    report = ImportReport.from_dict(job)
+    spool_path = Path(job["spool_path"])
+    try:
+        with open(spool_path, "rb") as spool_file:
+            report = await import_investor_rows(
+                spool_file,
+                report=report,
+                id_namespace=job["id_namespace"],
+                mode=job.get("mode", "insert"),
+                on_checkpoint=checkpoint,
+                should_cancel=cancel_requested
+            )
+        status_value = "cancelled" if report.cancelled else "completed"
+        failure = None
+    except Exception as e:
+        logger.error(f"Import job {job_id} failed: {e}", exc_info=True)
+        status_value = "failed"
+        failure = str(e)
+
+    await checkpoint(report)
+    await db.import_jobs.update_one({"job_id": job_id}, {"$set": {
+        "status": status_value,
+        "failure": failure,
+        "finished_at": datetime.now(timezone.utc)
+    }})
+    spool_path.unlink(missing_ok=True)
+
+def start_import_job(job: dict):
+    task = asyncio.create_task(run_import_job(job))
+    _import_tasks[job["job_id"]] = task
+    task.add_done_callback(lambda _: _import_tasks.pop(job["job_id"], None))
+
+async def resume_import_jobs():
+    active = await db.import_jobs.find(
+        {"status": {"$in": IMPORT_JOB_ACTIVE_STATUSES}}, {"_id": 0, "job_id": 1}
+    ).to_list(None)
+    for entry in active:
+        if entry["job_id"] in _import_tasks:
+            await db.import_jobs.update_one(
+                {"job_id": entry["job_id"], "owner": WORKER_ID},
+                {"$set": {"heartbeat_at": datetime.now(timezone.utc)}}
+            )
+            continue
+        job = await claim_import_job(entry["job_id"])
+        if job:
+            logger.info(f"Resuming import job {job['job_id']} after row {job.get('last_committed_row', 1)}")
+            start_import_job(job)
+
+async def import_job_supervisor():
+    while True:
+        try:
+            await resume_import_jobs()
+        except Exception as e:
+            logger.error(f"Import job supervisor error: {e}")
+        await asyncio.sleep(IMPORT_JOB_LEASE_SECONDS / 3)
+
+@api_router.post("/import-jobs", status_code=202)
+async def create_import_job(
+    file: UploadFile = File(...),
+    mode: str = Query("insert", pattern="^(insert|upsert)$"),
+    current_user: User = Depends(get_current_user)
+):
+    job_id = str(uuid.uuid4())
+    IMPORT_SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    spool_path = IMPORT_SPOOL_DIR / f"{job_id}.csv"
+    with open(spool_path, "wb") as spool_file:
+        await run_in_threadpool(shutil.copyfileobj, file.file, spool_file, IMPORT_CHUNK_SIZE)
+
+    now = datetime.now(timezone.utc)
+    job = {
+        "job_id": job_id,
+        "status": "queued",
+        "filename": file.filename,
+        "size_bytes": spool_path.stat().st_size,
+        "spool_path": str(spool_path),
+        "spool_host": WORKER_HOST,
+        "id_namespace": str(uuid.uuid4()),
+        "mode": mode,
+        "created_by": current_user.id,
+        "owner": WORKER_ID,
+        "heartbeat_at": now,
+        "cancel_requested": False,
+        "imported_count": 0,
+        "updated_count": 0,
+        "unchanged_count": 0,
+        "error_count": 0,
+        "errors": [],
+        "last_committed_row": 1,
+        "created_at": now
+    }
+    await db.import_jobs.insert_one(job)
+    start_import_job(job)
+    return {"job_id": job_id, "status": "queued"}
+
+@api_router.get("/import-jobs")
+async def list_import_jobs(current_user: User = Depends(get_current_user)):
+    projection = {**IMPORT_JOB_PROJECTION, "errors": 0}
+    return await db.import_jobs.find({}, projection).sort("created_at", -1).limit(50).to_list(50)
+
+@api_router.get("/import-jobs/{job_id}")
+async def get_import_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await db.import_jobs.find_one({"job_id": job_id}, IMPORT_JOB_PROJECTION)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    job["rows_processed"] = job["last_committed_row"] - 1
+    return job
+
+@api_router.post("/import-jobs/{job_id}/cancel")
+async def cancel_import_job(job_id: str, current_user: User = Depends(get_current_user)):
+    result = await db.import_jobs.update_one(
+        {"job_id": job_id, "status": {"$in": IMPORT_JOB_ACTIVE_STATUSES}},
+        {"$set": {"cancel_requested": True}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="No active import job with that id")
+    return {"job_id": job_id, "cancel_requested": True}
+
+# Transaction ledger
+# RTA feeds are POSTed as a raw NDJSON or CSV body and ingested batch by batch: lines are
+# parsed and validated in the import workers, and each batch is written with an unordered
+# insert_many while the next ones are read. Every transaction_id is unique, so replays are
+# dropped as duplicates: rows keep the RTA's transaction_id when they have one, otherwise an
+# Idempotency-Key header derives one from the line number, like resumable import jobs do.
+TRANSACTION_FIELDS = ("transaction_id", "investor_id", "folio_id", "scheme", "type", "amount", "date")
+TRANSACTION_PROJECTION = {"_id": 0, "holdings_applied": 0}
+TRANSACTION_LIST_SORT = [("date", DESCENDING), ("transaction_id", DESCENDING)]
+TRANSACTION_DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d-%b-%Y")
+
+def normalize_transaction_date(value: str) -> str:
+    # Stored as YYYY-MM-DD so string order is date order
+    value = str(value).strip()
+    if len(value) == 10 and value[4] == "-":
+        try:
+            return datetime.fromisoformat(value).date().isoformat()
+        except ValueError:
+            pass
+    for fmt in TRANSACTION_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value!r}")
+
+def validate_transaction_lines(lines: List[tuple], fmt: str, header: Optional[List[str]], id_namespace: Optional[str]):
+    # Runs in an import worker process; lines are (line_number, text) pairs, one CSV record per text
+    line_nums, docs, errors = [], [], []
+    if fmt == "csv":
+        parsed = zip((num for num, _ in lines), csv.DictReader((text for _, text in lines), fieldnames=header))
+    else:
+        parsed = ((num, text) for num, text in lines)
+    created_at = datetime.now(timezone.utc)
+    for line_num, row in parsed:
+        try:
+            if fmt != "csv":
+                row = json.loads(row)
+                if not isinstance(row, dict):
+                    raise ValueError("Each line must be a JSON object")
+            row = {field: row[field] for field in TRANSACTION_FIELDS if row.get(field) not in (None, "")}
+            row["date"] = normalize_transaction_date(row.get("date", ""))
+            row["type"] = str(row.get("type", "")).strip().lower()
+            if "transaction_id" not in row and id_namespace:
+                row["transaction_id"] = str(uuid.uuid5(uuid.UUID(id_namespace), str(line_num)))
+            doc = Transaction(**row).model_dump()
+            doc["created_at"] = created_at
+            doc["holdings_applied"] = False
+            docs.append(doc)
+            line_nums.append(line_num)
+        except Exception as e:
+            errors.append({"row": line_num, "error": str(e)})
+    return line_nums, docs, errors
+
+class TransactionIngestReport(ImportReport):
+    def __init__(self, max_errors: int = IMPORT_MAX_REPORTED_ERRORS):
+        super().__init__(max_errors)
+        self.received_count = 0
+        self.duplicate_count = 0
+        # Written to the ledger but not yet folded into holdings; a replay or rebuild applies them
+        self.holdings_pending_count = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "message": f"Ingested {self.imported_count} transactions",
+            "received_count": self.received_count,
+            "imported_count": self.imported_count,
+            "duplicate_count": self.duplicate_count,
+            "holdings_pending_count": self.holdings_pending_count,
+            "error_count": self.error_count,
+            "errors": sorted(self.errors, key=lambda error: error["row"])
+        }
+
+async def insert_transaction_batch(line_nums: List[int], docs: List[dict], report: TransactionIngestReport) -> List[dict]:
+    # Returns the documents that were actually written
+    try:
+        await db.transactions.insert_many(docs, ordered=False)
+        report.imported_count += len(docs)
+        return docs
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        report.imported_count += e.details.get("nInserted", 0)
+        duplicates = [err for err in write_errors if err.get("code") == 11000]
+        report.duplicate_count += len(duplicates)
+        report.add_errors([
+            {"row": line_nums[err["index"]], "error": err.get("errmsg", "write failed")}
+            for err in write_errors if err.get("code") != 11000
+        ])
+        failed = {err["index"] for err in write_errors}
+        return [doc for index, doc in enumerate(docs) if index not in failed]
+
+async def iter_body_lines(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        lines, pending = split_text_lines(pending + decoder.decode(chunk))
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def ingest_transactions(chunks, fmt: str, id_namespace: Optional[str] = None, batch_size: int = TRANSACTION_BATCH_SIZE, report: Optional[TransactionIngestReport] = None) -> TransactionIngestReport:
+    report = report or TransactionIngestReport()
+    loop = asyncio.get_running_loop()
+    executor = get_import_executor()
+    header = None
+    pending = set()
+
+    async def process(batch):
+        line_nums, docs, errors = await loop.run_in_executor(executor, validate_transaction_lines, batch, fmt, header, id_namespace)
+        report.add_errors(errors)
+        if docs:
+            inserted = await insert_transaction_batch(line_nums, docs, report)
+            # Every id in the batch, not just the inserted ones: a replay picks up rows whose
+            # earlier insert landed but whose holdings delta did not
             try:
-                folio_ids = [f.strip() for f in row.get('folio_ids', '').split(',') if f.strip()]
-                
-                investor_data = InvestorCreate(
-                    arn=row['arn'],
-                    first_name=row['first_name'],
-                    last_name=row['last_name'],
-                    email=row['email'],
-                    phone=row['phone'],
-                    dob=row['dob'],
-                    kyc_status=row['kyc_status'],
-                    pan=row['pan'],
-                    address=row['address'],
-                    city=row['city'],
-                    state=row['state'],
-                    pincode=row['pincode'],
-                    folio_ids=folio_ids,
-                    risk_profile=row['risk_profile'],
-                    amt_aum=float(row['amt_aum']),
-                    preferred_contact=row['preferred_contact'],
-                    notes=row.get('notes', '')
-                )
-                
-                investor = Investor(**investor_data.model_dump())
-                investor_dict = investor.model_dump()
-                investor_dict["created_at"] = investor_dict["created_at"].isoformat()
-                investor_dict["updated_at"] = investor_dict["updated_at"].isoformat()
-                
-                await db.investors.insert_one(investor_dict)
-                imported_count += 1
+                await apply_pending_holdings([doc["transaction_id"] for doc in docs])
             except Exception as e:
-                errors.append({"row": row_num, "error": str(e)})
+                # The rows stay flagged pending in the ledger, so nothing is lost
+                logger.error(f"Holdings delta failed for {len(inserted)} ingested transaction(s): {e}", exc_info=True)
+                report.holdings_pending_count += len(inserted)
+
+    async def submit(batch):
+        while len(pending) >= IMPORT_MAX_INFLIGHT_BATCHES:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.difference_update(done)
+            for task in done:
+                task.result()
+        pending.add(asyncio.create_task(process(batch)))
+
+    async def iter_records():
+        # (first line number, text) per record. A quoted CSV field may span lines, so a CSV
+        # record stays open while it holds an odd number of quote characters ("" escapes keep parity).
+        line_num = 0
+        record, record_start, quotes = "", 0, 0
+        async for line in iter_body_lines(chunks):
+            line_num += 1
+            if fmt != "csv":
+                yield line_num, line
+                continue
+            if not record:
+                record_start = line_num
+            record += line
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                yield record_start, record
+                record, quotes = "", 0
+        if record:
+            yield record_start, record
+
+    batch = []
+    try:
+        async for line_num, record in iter_records():
+            if not record.strip():
+                continue
+            if fmt == "csv" and header is None:
+                header = [name.strip() for name in next(csv.reader([record]))]
+                continue
+            report.received_count += 1
+            batch.append((line_num, record))
+            if len(batch) >= batch_size:
+                await submit(batch)
+                batch = []
+        if batch:
+            await submit(batch)
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        for task in pending:
+            task.cancel()
+    return report
+
+def encode_transaction_cursor(doc: dict) -> str:
+    raw = json.dumps([doc["date"], doc["transaction_id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_transaction_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, transaction_id = json.loads(raw)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"date": {"$lt": date}},
+        {"date": date, "transaction_id": {"$lt": transaction_id}}
+    ]}
+
+@api_router.post("/transactions/ingest")
+async def ingest_transactions_feed(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    idempotency_key: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    id_namespace = str(uuid.uuid5(uuid.NAMESPACE_URL, f"transactions:{idempotency_key}")) if idempotency_key else None
+    report = TransactionIngestReport()
+    try:
+        await ingest_transactions(request.stream(), format, id_namespace, report=report)
+    except (ValueError, csv.Error) as e:
+        # Malformed body (bad encoding or CSV header); batches before it are already written
+        raise HTTPException(status_code=400, detail={
+            "message": f"Error ingesting transactions: {str(e)}",
+            "report": report.to_dict()
+        })
+    return report.to_dict()
+
+@api_router.get("/transactions", response_model=TransactionPage)
+async def list_transactions(
+    investor_id: Optional[str] = None,
+    folio_id: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    cursor: Optional[str] = None,
+    page_size: int = Query(TRANSACTION_PAGE_SIZE, ge=1, le=TRANSACTION_MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user)
+):
+    # Newest first; every shape is an index range scan on (investor_id|folio_id, date)
+    if bool(investor_id) == bool(folio_id):
+        raise HTTPException(status_code=400, detail="Provide exactly one of investor_id or folio_id")
+    query = {"investor_id": investor_id} if investor_id else {"folio_id": folio_id}
+    try:
+        date_range = {}
+        if date_from:
+            date_range["$gte"] = normalize_transaction_date(date_from)
+        if date_to:
+            date_range["$lte"] = normalize_transaction_date(date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if date_range:
+        query["date"] = date_range
+    if cursor:
+        query = {"$and": [query, decode_transaction_cursor(cursor)]}
+    
+    transactions = await db.transactions.find(query, TRANSACTION_PROJECTION).sort(TRANSACTION_LIST_SORT).limit(page_size + 1).to_list(page_size + 1)
+    next_cursor = None
+    if len(transactions) > page_size:
+        transactions = transactions[:page_size]
+        next_cursor = encode_transaction_cursor(transactions[-1])
+    
+    if (await current_feature_flags()).fast_json_responses:
+        return FastJSONResponse({"items": transactions, "next_cursor": next_cursor})
+    return {"items": transactions, "next_cursor": next_cursor}
+
+# Holdings
+# Net invested amount per (investor, folio, scheme), materialized from the ledger. Each
+# ingested batch is folded into per-key deltas and applied with $inc, and the owning
+# investors' amt_aum moves by the same amount, so the dashboard counters, facets and
+# analyses keep reading amt_aum. The first ledger-backed holding replaces a hand-typed
+# amt_aum (aum_source marks the switch). rebuild_holdings() recomputes everything from
+# the ledger and is the only place the full aggregation runs.
+#
+# Transactions are inserted with holdings_applied=false and flipped once their delta is in.
+# Folding deltas and rebuilding both run under one lease document in the settings
+# collection, so they exclude each other across API workers and manage.py. The rebuild
+# aggregates only applied rows and then folds whatever is still pending, so a batch
+# inserted mid-rebuild is counted exactly once, and rows whose delta failed are picked up
+# by a replay of the same batch or by the next rebuild.
+TRANSACTION_INFLOW_TYPES = ("purchase", "sip", "switch_in", "dividend_reinvestment")
+TRANSACTION_OUTFLOW_TYPES = ("redemption", "switch_out", "swp")
+HOLDING_PROJECTION = {"_id": 0}
+HOLDINGS_LEASE_KEY = {"type": "holdings_lease"}
+PENDING_HOLDINGS_QUERY = {"holdings_applied": False}
+# Rows written before the flag existed have no holdings_applied and count as applied
+APPLIED_HOLDINGS_QUERY = {"holdings_applied": {"$ne": False}}
+_holdings_lock = asyncio.Lock()  # saves polling the lease for contention inside one process
+
+@asynccontextmanager
+async def holdings_lease():
+    token = uuid.uuid4().hex
+    async with _holdings_lock:
+        while True:
+            now = datetime.now(timezone.utc)
+            try:
+                # The unique type index turns a claim of a live lease into a duplicate key error
+                await db.settings.update_one(
+                    {**HOLDINGS_LEASE_KEY, "$or": [{"owner": None}, {"expires_at": {"$lt": now}}]},
+                    {"$set": {"owner": token, "expires_at": now + timedelta(seconds=HOLDINGS_LEASE_SECONDS)}},
+                    upsert=True
+                )
+                break
+            except DuplicateKeyError:
+                await asyncio.sleep(0.05)
+
+        async def renew():
+            while True:
+                await asyncio.sleep(HOLDINGS_LEASE_SECONDS / 3)
+                await db.settings.update_one(
+                    {**HOLDINGS_LEASE_KEY, "owner": token},
+                    {"$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=HOLDINGS_LEASE_SECONDS)}}
+                )
+
+        renewer = asyncio.create_task(renew())
+        try:
+            yield
+        finally:
+            renewer.cancel()
+            await db.settings.update_one({**HOLDINGS_LEASE_KEY, "owner": token}, {"$set": {"owner": None}})
+
+def signed_transaction_amount(doc: dict) -> float:
+    if doc["type"] in TRANSACTION_INFLOW_TYPES:
+        return doc["amount"]
+    if doc["type"] in TRANSACTION_OUTFLOW_TYPES:
+        return -doc["amount"]
+    return 0.0
+
+SIGNED_AMOUNT_EXPR = {"$switch": {
+    "branches": [
+        {"case": {"$in": ["$type", list(TRANSACTION_INFLOW_TYPES)]}, "then": "$amount"},
+        {"case": {"$in": ["$type", list(TRANSACTION_OUTFLOW_TYPES)]}, "then": {"$multiply": ["$amount", -1]}},
+    ],
+    "default": 0
+}}
+
+def investor_aum_update(amount: float, folio_ids: List[str], replace: bool, now: datetime) -> list:
+    # Pipeline update: adds to a ledger-backed amt_aum, replaces a hand-typed one, and
+    # appends unseen folios without reordering the existing ones
+    existing_folios = {"$ifNull": ["$folio_ids", []]}
+    if replace:
+        new_aum = amount
+    else:
+        new_aum = {"$cond": [
+            {"$eq": ["$aum_source", "holdings"]},
+            {"$add": [{"$ifNull": ["$amt_aum", 0]}, amount]},
+            amount
+        ]}
+    return [{"$set": {
+        "amt_aum": new_aum,
+        "aum_source": "holdings",
+        "folio_ids": {"$concatArrays": [existing_folios, {"$filter": {
+            "input": folio_ids,
+            "as": "folio",
+            "cond": {"$eq": [{"$in": ["$$folio", existing_folios]}, False]}
+        }}]},
+        "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+        "updated_at": now
+    }}]
+
+async def fold_holding_deltas(transactions: List[dict]) -> float:
+    # Caller holds holdings_lease(); returns the change in total AUM
+    holdings, investors = {}, {}
+    for doc in transactions:
+        amount = signed_transaction_amount(doc)
+        key = (doc["investor_id"], doc["folio_id"], doc["scheme"])
+        holding = holdings.setdefault(key, {"amount": 0.0, "count": 0, "last_date": doc["date"]})
+        holding["amount"] += amount
+        holding["count"] += 1
+        holding["last_date"] = max(holding["last_date"], doc["date"])
+        investor = investors.setdefault(doc["investor_id"], {"amount": 0.0, "folios": set()})
+        investor["amount"] += amount
+        investor["folios"].add(doc["folio_id"])
+    
+    now = datetime.now(timezone.utc)
+    await db.holdings.bulk_write([
+        UpdateOne(
+            {"investor_id": investor_id, "folio_id": folio_id, "scheme": scheme},
+            {
+                "$inc": {"amount": delta["amount"], "transaction_count": delta["count"]},
+                "$max": {"last_transaction_date": delta["last_date"]},
+                "$set": {"updated_at": now}
+            },
+            upsert=True
+        )
+        for (investor_id, folio_id, scheme), delta in holdings.items()
+    ], ordered=False)
+    
+    # The lease keeps this pre-image in step with what the investor update applies to
+    before = {}
+    async for doc in db.investors.find(
+        {"investor_id": {"$in": list(investors)}},
+        {"_id": 0, "investor_id": 1, "amt_aum": 1, "aum_source": 1}
+    ):
+        before[doc["investor_id"]] = doc
+    if before:
+        await db.investors.bulk_write([
+            UpdateOne({"investor_id": investor_id}, investor_aum_update(investors[investor_id]["amount"], sorted(investors[investor_id]["folios"]), False, now))
+            for investor_id in before
+        ], ordered=False)
+    
+    # Marked last: a failure above leaves the rows pending for a replay or the next rebuild
+    await db.transactions.update_many(
+        {"transaction_id": {"$in": [doc["transaction_id"] for doc in transactions]}},
+        {"$set": {"holdings_applied": True}}
+    )
+    
+    aum_delta = 0.0
+    for investor_id, doc in before.items():
+        aum_delta += investors[investor_id]["amount"]
+        if doc.get("aum_source") != "holdings":
+            aum_delta -= doc.get("amt_aum") or 0
+    return aum_delta
+
+async def fold_pending_holdings(query: dict, batch_size: int = TRANSACTION_BATCH_SIZE) -> dict:
+    # Caller holds holdings_lease()
+    folded, aum_delta = 0, 0.0
+    projection = {"_id": 0, **{field: 1 for field in ("transaction_id", "investor_id", "folio_id", "scheme", "type", "amount", "date")}}
+    while True:
+        pending = await db.transactions.find({**query, **PENDING_HOLDINGS_QUERY}, projection).limit(batch_size).to_list(batch_size)
+        if not pending:
+            return {"transactions": folded, "total_aum": aum_delta}
+        aum_delta += await fold_holding_deltas(pending)
+        folded += len(pending)
+
+async def apply_pending_holdings(transaction_ids: List[str]) -> int:
+    if not transaction_ids:
+        return 0
+    async with holdings_lease():
+        result = await fold_pending_holdings({"transaction_id": {"$in": transaction_ids}})
+    if result["transactions"]:
+        await record_investor_write({"total_aum": result["total_aum"]})
+    return result["transactions"]
+
+async def rebuild_holdings(batch_size: int = 1000) -> dict:
+    # Full reconciliation from the ledger; $out swaps the collection in atomically and keeps its indexes
+    async with holdings_lease():
+        await db.transactions.aggregate([
+            {"$match": APPLIED_HOLDINGS_QUERY},
+            {"$group": {
+                "_id": {"investor_id": "$investor_id", "folio_id": "$folio_id", "scheme": "$scheme"},
+                "amount": {"$sum": SIGNED_AMOUNT_EXPR},
+                "transaction_count": {"$sum": 1},
+                "last_transaction_date": {"$max": "$date"}
+            }},
+            {"$project": {
+                "_id": 0,
+                "investor_id": "$_id.investor_id",
+                "folio_id": "$_id.folio_id",
+                "scheme": "$_id.scheme",
+                "amount": 1,
+                "transaction_count": 1,
+                "last_transaction_date": 1,
+                "updated_at": datetime.now(timezone.utc)
+            }},
+            {"$out": "holdings"}
+        ]).to_list(None)
+        
+        now = datetime.now(timezone.utc)
+        updated = 0
+        seen = set()
+        ops = []
+        async for total in db.holdings.aggregate([
+            {"$group": {"_id": "$investor_id", "amount": {"$sum": "$amount"}, "folio_ids": {"$addToSet": "$folio_id"}}}
+        ]):
+            seen.add(total["_id"])
+            folio_ids = sorted(total["folio_ids"])
+            # Only investors the rebuild actually changes get a new version (and ETag)
+            changed = {"$or": [
+                {"amt_aum": {"$ne": total["amount"]}},
+                {"aum_source": {"$ne": "holdings"}},
+                {"folio_ids": {"$not": {"$all": folio_ids}}}
+            ]}
+            ops.append(UpdateOne({"investor_id": total["_id"], **changed}, investor_aum_update(total["amount"], folio_ids, True, now)))
+            if len(ops) >= batch_size:
+                updated += (await db.investors.bulk_write(ops, ordered=False)).modified_count
+                ops = []
+        if ops:
+            updated += (await db.investors.bulk_write(ops, ordered=False)).modified_count
         
+        # Ledger-backed investors whose transactions are all gone
+        orphaned = await db.investors.update_many(
+            {"aum_source": "holdings", "investor_id": {"$nin": list(seen)}, "amt_aum": {"$ne": 0}},
+            {"$set": {"amt_aum": 0.0, "updated_at": now}, "$inc": {"version": 1}}
+        )
+        pending = await fold_pending_holdings({})
+        holdings_count = await db.holdings.count_documents({})
+    
+    await record_investor_write()
+    await reconcile_dashboard_stats()
+    return {
+        "holdings": holdings_count,
+        "investors_updated": updated,
+        "investors_zeroed": orphaned.modified_count,
+        "pending_transactions_folded": pending["transactions"]
+    }
+
+@api_router.get("/investors/{investor_id}/holdings")
+async def get_investor_holdings(investor_id: str, current_user: User = Depends(get_current_user)):
+    holdings = await db.holdings.find({"investor_id": investor_id}, HOLDING_PROJECTION).to_list(None)
+    return {
+        "investor_id": investor_id,
+        "total_amount": sum(holding["amount"] for holding in holdings),
+        "holdings": sorted(holdings, key=lambda holding: (holding["folio_id"], holding["scheme"]))
+    }
+
+# Analysis engine
+# Each analysis type declares the investor columns it needs and computes its metrics two ways:
+# one vectorized NumPy pass over columns loaded from Mongo, or a $group pushed down into Mongo.
+# The engine picks the strategy by selection size; register_analysis_type() adds new types.
+ANALYSIS_COLUMN_PROJECTIONS = {
+    "investor_id": 1,
+    "risk_profile": 1,
+    "kyc_status": 1,
+    "amt_aum": 1,
+    "folio_count": {"$size": {"$ifNull": ["$folio_ids", []]}},
+}
+
+class AnalysisType(ABC):
+    # register_analysis_type instantiates each subclass, so a missing method fails at import
+    name = ""
+    columns: tuple = ()
+
+    @abstractmethod
+    def vectorized(self, columns: Dict[str, np.ndarray]) -> dict:
+        # Additive partial metrics for one batch; batches are merged by summing before finalize()
+        ...
+
+    @abstractmethod
+    def accumulators(self) -> dict:
+        ...
+
+    def finalize(self, metrics: dict) -> dict:
+        return metrics
+
+    @abstractmethod
+    def report(self, metrics: dict) -> tuple:
+        # -> (executive_summary, action_items, risk_alerts)
+        ...
+
+ANALYSIS_TYPES: Dict[str, AnalysisType] = {}
+
+def register_analysis_type(analysis_cls):
+    ANALYSIS_TYPES[analysis_cls.name] = analysis_cls()
+    return analysis_cls
+
+@register_analysis_type
+class RiskSummaryAnalysis(AnalysisType):
+    name = "risk_summary"
+    columns = ("risk_profile", "kyc_status", "amt_aum")
+
+    def vectorized(self, columns):
         return {
-            "message": f"Successfully imported {imported_count} investors",
-            "imported_count": imported_count,
-            "errors": errors
+            "total_investors": int(len(columns["amt_aum"])),
+            "high_risk_count": int(np.count_nonzero(columns["risk_profile"] == "High")),
+            "no_kyc_count": int(np.count_nonzero(columns["kyc_status"] == "N")),
+            "total_aum": float(columns["amt_aum"].sum())
         }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error processing CSV: {str(e)}")
 
-# AI Analysis Routes
-async def run_mock_analysis(analysis_type: str, investors: List[dict]) -> AnalysisResult:
-    if analysis_type == "risk_summary":
-        high_risk_count = sum(1 for inv in investors if inv.get("risk_profile") == "High")
-        no_kyc_count = sum(1 for inv in investors if inv.get("kyc_status") == "N")
-        
-        executive_summary = f"Analyzed {len(investors)} investor(s). {high_risk_count} are high-risk profile. {no_kyc_count} have incomplete KYC."
+    def accumulators(self):
+        return {
+            "total_investors": {"$sum": 1},
+            "high_risk_count": {"$sum": {"$cond": [{"$eq": ["$risk_profile", "High"]}, 1, 0]}},
+            "no_kyc_count": {"$sum": {"$cond": [{"$eq": ["$kyc_status", "N"]}, 1, 0]}},
+            "total_aum": {"$sum": {"$ifNull": ["$amt_aum", 0]}}
+        }
+
+    def report(self, metrics):
+        total, high_risk_count, no_kyc_count = metrics["total_investors"], metrics["high_risk_count"], metrics["no_kyc_count"]
+        executive_summary = f"Analyzed {total} investor(s). {high_risk_count} are high-risk profile. {no_kyc_count} have incomplete KYC."
         
         action_items = [
             "Complete KYC for all pending investors",
@@ -498,28 +2794,43 @@ async def run_mock_analysis(analysis_type: str, investors: List[dict]) -> Analys
         risk_alerts = []
         if no_kyc_count > 0:
             risk_alerts.append(f"{no_kyc_count} investor(s) have incomplete KYC - regulatory compliance issue")
-        if high_risk_count > len(investors) * 0.5:
+        if high_risk_count > total * 0.5:
             risk_alerts.append("Over 50% of analyzed investors have high-risk profiles")
-        
-        return AnalysisResult(
-            investor_ids=[inv["investor_id"] for inv in investors],
-            analysis_type=analysis_type,
-            executive_summary=executive_summary,
-            action_items=action_items,
-            risk_alerts=risk_alerts,
-            details={
-                "total_investors": len(investors),
-                "high_risk_count": high_risk_count,
-                "no_kyc_count": no_kyc_count,
-                "total_aum": sum(inv.get("amt_aum", 0) for inv in investors)
-            }
-        )
-    
-    elif analysis_type == "allocation_check":
-        total_aum = sum(inv.get("amt_aum", 0) for inv in investors)
-        avg_aum = total_aum / len(investors) if investors else 0
-        
-        executive_summary = f"Portfolio allocation analysis for {len(investors)} investor(s). Total AUM: ₹{total_aum:,.2f}. Average AUM: ₹{avg_aum:,.2f}."
+        return executive_summary, action_items, risk_alerts
+
+@register_analysis_type
+class AllocationCheckAnalysis(AnalysisType):
+    name = "allocation_check"
+    columns = ("amt_aum", "folio_count")
+
+    def vectorized(self, columns):
+        return {
+            "total_investors": int(len(columns["amt_aum"])),
+            "total_aum": float(columns["amt_aum"].sum()),
+            "low_diversification_count": int(np.count_nonzero(columns["folio_count"] < 2))
+        }
+
+    def accumulators(self):
+        return {
+            "total_investors": {"$sum": 1},
+            "total_aum": {"$sum": {"$ifNull": ["$amt_aum", 0]}},
+            "low_diversification_count": {"$sum": {"$cond": [
+                {"$lt": [{"$size": {"$ifNull": ["$folio_ids", []]}}, 2]}, 1, 0
+            ]}}
+        }
+
+    def finalize(self, metrics):
+        total = metrics["total_investors"]
+        return {
+            "total_investors": total,
+            "total_aum": metrics["total_aum"],
+            "average_aum": metrics["total_aum"] / total if total else 0,
+            "low_diversification_count": metrics["low_diversification_count"]
+        }
+
+    def report(self, metrics):
+        total_aum, avg_aum = metrics["total_aum"], metrics["average_aum"]
+        executive_summary = f"Portfolio allocation analysis for {metrics['total_investors']} investor(s). Total AUM: ₹{total_aum:,.2f}. Average AUM: ₹{avg_aum:,.2f}."
         
         action_items = [
             "Diversify portfolios with less than 3 folios",
@@ -528,166 +2839,550 @@ async def run_mock_analysis(analysis_type: str, investors: List[dict]) -> Analys
         ]
         
         risk_alerts = []
-        low_folio_count = sum(1 for inv in investors if len(inv.get("folio_ids", [])) < 2)
+        low_folio_count = metrics["low_diversification_count"]
         if low_folio_count > 0:
             risk_alerts.append(f"{low_folio_count} investor(s) have limited diversification (< 2 folios)")
-        
+        return executive_summary, action_items, risk_alerts
+
+def columns_from_documents(docs: List[dict], names) -> Dict[str, np.ndarray]:
+    columns = {}
+    for name in names:
+        if name == "amt_aum":
+            columns[name] = np.fromiter((doc.get("amt_aum") or 0 for doc in docs), dtype=np.float64, count=len(docs))
+        elif name == "folio_count":
+            columns[name] = np.fromiter(
+                (doc["folio_count"] if "folio_count" in doc else len(doc.get("folio_ids") or []) for doc in docs),
+                dtype=np.int64, count=len(docs)
+            )
+        else:
+            columns[name] = np.array([doc.get(name) or "" for doc in docs], dtype=str)
+    return columns
+
+async def iter_analysis_columns(query: dict, names, batch_size: int = None):
+    # Streams only the needed fields and yields (columns, investor_ids) one batch at a time
+    batch_size = batch_size or ANALYSIS_LOAD_BATCH_SIZE
+    projection = {"_id": 0, "investor_id": 1, **{name: ANALYSIS_COLUMN_PROJECTIONS[name] for name in names}}
+    batch = []
+    async for doc in db.investors.find(query, projection).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield columns_from_documents(batch, names), [doc["investor_id"] for doc in batch]
+            batch = []
+    if batch:
+        yield columns_from_documents(batch, names), [doc["investor_id"] for doc in batch]
+
+def merge_analysis_metrics(total: dict, partial: dict) -> dict:
+    for key, value in partial.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+async def aggregate_analysis_metrics(analysis: AnalysisType, query: dict) -> dict:
+    pipeline = [{"$match": query}, {"$group": {"_id": None, **analysis.accumulators()}}]
+    result = await db.investors.aggregate(pipeline).to_list(1)
+    if not result:
+        return {}
+    metrics = {key: value for key, value in result[0].items() if key != "_id"}
+    return analysis.finalize(metrics)
+
+def build_analysis_result(analysis_type: str, metrics: dict, investor_ids: List[str]) -> AnalysisResult:
+    analysis = ANALYSIS_TYPES.get(analysis_type)
+    if analysis is None:
         return AnalysisResult(
-            investor_ids=[inv["investor_id"] for inv in investors],
+            investor_ids=investor_ids,
+            investor_count=len(investor_ids),
             analysis_type=analysis_type,
-            executive_summary=executive_summary,
-            action_items=action_items,
-            risk_alerts=risk_alerts,
-            details={
-                "total_investors": len(investors),
-                "total_aum": total_aum,
-                "average_aum": avg_aum,
-                "low_diversification_count": low_folio_count
-            }
+            executive_summary="Analysis type not supported",
+            action_items=[],
+            risk_alerts=[],
+            details={}
         )
-    
+    executive_summary, action_items, risk_alerts = analysis.report(metrics)
     return AnalysisResult(
-        investor_ids=[inv["investor_id"] for inv in investors],
+        investor_ids=investor_ids,
+        investor_count=metrics.get("total_investors", len(investor_ids)),
         analysis_type=analysis_type,
-        executive_summary="Analysis type not supported",
-        action_items=[],
-        risk_alerts=[],
-        details={}
+        executive_summary=executive_summary,
+        action_items=action_items,
+        risk_alerts=risk_alerts,
+        details=metrics
     )
 
-async def run_live_analysis(analysis_type: str, investors: List[dict]) -> AnalysisResult:
+async def run_analysis_engine(analysis_type: str, query: dict, expected_size: int, keep_ids: bool = True) -> Optional[AnalysisResult]:
+    # None when the selection matches no investors. keep_ids=False records only the count,
+    # so a selection of any size never materialises its id list.
+    analysis = ANALYSIS_TYPES.get(analysis_type)
+    if analysis is None:
+        if not await db.investors.find_one(query, {"_id": 1}):
+            return None
+        investor_ids = [doc["investor_id"] async for doc in db.investors.find(query, {"_id": 0, "investor_id": 1})] if keep_ids else []
+        return build_analysis_result(analysis_type, {}, investor_ids)
+
+    investor_ids = []
+    if expected_size > ANALYSIS_PUSHDOWN_THRESHOLD:
+        strategy = "aggregation"
+        metrics = await aggregate_analysis_metrics(analysis, query)
+        if not metrics:
+            return None
+        if keep_ids:
+            investor_ids = [doc["investor_id"] async for doc in db.investors.find(query, {"_id": 0, "investor_id": 1})]
+    else:
+        strategy = "vectorized"
+        metrics = {}
+        async for columns, batch_ids in iter_analysis_columns(query, analysis.columns):
+            merge_analysis_metrics(metrics, analysis.vectorized(columns))
+            if keep_ids:
+                investor_ids.extend(batch_ids)
+        if not metrics:
+            return None
+        metrics = analysis.finalize(metrics)
+    logger.debug("Analysis %s over %d investor(s) computed via %s", analysis_type, metrics["total_investors"], strategy)
+    return build_analysis_result(analysis_type, metrics, investor_ids)
+
+# Analysis memoization
+# A result is reusable while its inputs are unchanged. Every investor write stamps updated_at
+# with the current time, so one $group over the selection yields a fingerprint that moves
+# whenever a member is added, removed or edited: the count, the sum of updated_at in
+# milliseconds and the sum of a hash per investor_id. Sums do not depend on scan order and a
+# swapped member shifts both. Stored analyses carry their cache_key, so hits survive restarts
+# and are shared by workers; the in-process layer only saves the lookup.
+analysis_cache = TTLLRUCache(ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_TTL_SECONDS)
+# $toHashedIndexKey needs MongoDB 7.0; older servers fingerprint on count and timestamps only
+_fingerprint_member_hashes = True
+UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def analysis_fingerprint_pipeline(query: dict, member_hashes: bool) -> list:
+    group = {
+        "_id": None,
+        "count": {"$sum": 1},
+        # Strings sort below dates in BSON order, so rows backfill_datetimes has not reached
+        # yet (and rows without updated_at) add nothing instead of failing the $subtract
+        "updated_sum": {"$sum": {"$cond": [
+            {"$gte": ["$updated_at", UNIX_EPOCH]},
+            {"$subtract": ["$updated_at", UNIX_EPOCH]},
+            0
+        ]}}
+    }
+    if member_hashes:
+        group["member_hash"] = {"$sum": {"$toHashedIndexKey": "$investor_id"}}
+    return [{"$match": query}, {"$group": group}]
+
+async def analysis_input_fingerprint(query: dict) -> Optional[dict]:
+    global _fingerprint_member_hashes
+    result = None
+    if _fingerprint_member_hashes:
+        try:
+            result = await db.investors.aggregate(analysis_fingerprint_pipeline(query, True)).to_list(1)
+        except OperationFailure as e:
+            logger.warning(f"Analysis fingerprints fall back to timestamps only: {e}")
+            _fingerprint_member_hashes = False
+    if not _fingerprint_member_hashes:
+        result = await db.investors.aggregate(analysis_fingerprint_pipeline(query, False)).to_list(1)
+    if not result:
+        return None
+    return {"count": result[0]["count"], "digest": f"{result[0]['updated_sum']}:{result[0].get('member_hash', '')}"}
+
+def analysis_cache_key(request: AnalysisRequest, fingerprint: dict) -> str:
+    if request.selection:
+        target = request.selection.model_dump(exclude_none=True)
+    else:
+        target = sorted(set(request.investor_ids))
+    raw = json.dumps(
+        [request.analysis_type, ANALYSIS_ENGINE_VERSION, request.use_live_ai, target,
+         fingerprint["count"], fingerprint["digest"]],
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+async def find_memoized_analysis(cache_key: str) -> Optional[dict]:
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    oldest = datetime.now(timezone.utc) - timedelta(seconds=ANALYSIS_CACHE_TTL_SECONDS)
+    stored = await db.analyses.find_one(
+        {"cache_key": cache_key, "created_at": {"$gte": oldest}},
+        {"_id": 0},
+        sort=[("created_at", DESCENDING)]
+    )
+    if stored:
+        age = (datetime.now(timezone.utc) - stored["created_at"]).total_seconds()
+        analysis_cache.set(cache_key, stored, ttl=ANALYSIS_CACHE_TTL_SECONDS - age)
+    return stored
+
+# Live AI client
+# Model calls go through one LLMClient: a global concurrency limit, a per-call timeout,
+# retries with full jitter on timeouts/429/5xx, and a prompt-hash response cache. The
+# transport only turns (system, prompt) into text, so tests can point LLM_BASE_URL at a
+# local stub server or swap llm_client for one built on any object with complete().
+class LLMError(Exception):
+    pass
+
+class LLMRetryableError(LLMError):
+    pass
+
+class HTTPChatTransport:
+    # OpenAI-compatible POST {base_url}/chat/completions
+    def __init__(self, base_url: str, api_key: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=LLM_TIMEOUT_SECONDS,
+                transport=self._transport
+            )
+        return self._client
+
+    async def complete(self, system: str, prompt: str, model: str) -> str:
+        response = await self._get_client().post("/chat/completions", json={
+            "model": model,
+            "messages": [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.2
+        })
+        if response.status_code == 429 or response.status_code >= 500:
+            raise LLMRetryableError(f"LLM returned {response.status_code}")
+        if response.status_code >= 400:
+            raise LLMError(f"LLM returned {response.status_code}: {response.text[:200]}")
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            raise LLMError("Malformed LLM response")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+def parse_llm_json(text: str) -> dict:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.index("\n") + 1:] if "\n" in text else text
     try:
-        api_key = os.getenv("EMERGENT_LLM_KEY")
-        if not api_key:
-            raise Exception("EMERGENT_LLM_KEY not found")
-        
-        # chat = LlmChat(
-        #     api_key=api_key,
-        #     session_id=f"analysis_{uuid.uuid4()}",
-        #     system_message="You are an expert financial analyst specializing in mutual fund portfolio analysis for Indian investors."
-        # ).with_model("openai", "gpt-4o-mini")
+        result = json.loads(text)
+    except ValueError:
+        raise LLMError("LLM response is not JSON")
+    if not isinstance(result, dict):
+        raise LLMError("LLM response is not a JSON object")
+    return result
+
+class LLMClient:
+    def __init__(self, transport, model: str, max_concurrency: int, timeout: float, max_retries: int):
+        self.transport = transport
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.cache = TTLLRUCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.max_concurrency = max(1, max_concurrency)
+        self.in_flight = 0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    async def complete_json(self, system: str, prompt: str) -> dict:
+        key = hashlib.sha256(f"{self.model}\0{system}\0{prompt}".encode()).hexdigest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
         
-        investor_summary = "\n".join([
-            f"- {inv['first_name']} {inv['last_name']}: Risk Profile: {inv['risk_profile']}, AUM: ₹{inv['amt_aum']:,.2f}, KYC: {inv['kyc_status']}, Folios: {len(inv.get('folio_ids', []))}"
-            for inv in investors[:10]
-        ])
+        for attempt in range(self.max_retries + 1):
+            try:
+                # The slot is held per attempt, never across a backoff sleep
+                async with self._semaphore:
+                    self.in_flight += 1
+                    self.calls += 1
+                    try:
+                        text = await asyncio.wait_for(self.transport.complete(system, prompt, self.model), self.timeout)
+                    finally:
+                        self.in_flight -= 1
+                break
+            except (asyncio.TimeoutError, httpx.TransportError, LLMRetryableError) as e:
+                if attempt == self.max_retries:
+                    self.failures += 1
+                    raise LLMError(f"LLM call failed after {attempt + 1} attempt(s): {e!r}")
+                self.retries += 1
+                await asyncio.sleep(random.uniform(0, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+            except LLMError:
+                self.failures += 1
+                raise
         
-        if analysis_type == "risk_summary":
-            prompt = f"""Analyze the following investors and provide:
-1. Executive Summary (2-3 sentences)
-2. Top 3 Action Items
-3. Risk Alerts (if any)
+        result = parse_llm_json(text)
+        self.cache.set(key, result)
+        return result
 
-Investors:
-{investor_summary}
+    async def aclose(self):
+        if hasattr(self.transport, "aclose"):
+            await self.transport.aclose()
 
-Provide the response in JSON format with keys: executive_summary, action_items (array), risk_alerts (array)."""
-        
-        elif analysis_type == "allocation_check":
-            prompt = f"""Analyze the portfolio allocation for the following investors and provide:
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "cache": self.cache.stats()
+        }
+
+llm_client: Optional[LLMClient] = None
+
+def get_llm_client() -> Optional[LLMClient]:
+    global llm_client
+    if llm_client is None and LLM_API_KEY:
+        llm_client = LLMClient(
+            HTTPChatTransport(LLM_BASE_URL, LLM_API_KEY),
+            model=LLM_MODEL,
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            timeout=LLM_TIMEOUT_SECONDS,
+            max_retries=LLM_MAX_RETRIES
+        )
+    return llm_client
+
+async def gather_llm_calls(llm: LLMClient, prompts: List[Optional[str]], passthrough: Optional[list] = None) -> List[dict]:
+    # A None prompt keeps the matching passthrough value. Siblings run to completion (and are
+    # cached) even when one fails, so a retried analysis only repeats the failed calls.
+    async def one(index, prompt):
+        if prompt is None:
+            return passthrough[index]
+        return await llm.complete_json(ANALYST_SYSTEM_PROMPT, prompt)
+    results = await asyncio.gather(*(one(i, prompt) for i, prompt in enumerate(prompts)), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+ANALYST_SYSTEM_PROMPT = "You are an expert financial analyst specializing in mutual fund portfolio analysis for Indian investors."
+
+ANALYSIS_PROMPT_TASKS = {
+    "risk_summary": """Analyze the following investors and provide:
+1. Executive Summary (2-3 sentences)
+2. Top 3 Action Items
+3. Risk Alerts (if any)""",
+    "allocation_check": """Analyze the portfolio allocation for the following investors and provide:
 1. Executive Summary (2-3 sentences)
 2. Top 3 Action Items for better allocation
-3. Risk Alerts regarding concentration (if any)
+3. Risk Alerts regarding concentration (if any)""",
+}
+
+LLM_RESPONSE_FORMAT = "Provide the response in JSON format with keys: executive_summary, action_items (array), risk_alerts (array)."
+
+def build_chunk_prompt(analysis_type: str, investors: List[dict], index: int, total_chunks: int) -> str:
+    task = ANALYSIS_PROMPT_TASKS.get(analysis_type, "Analyze these investors")
+    investor_summary = "\n".join([
+        f"- {inv['first_name']} {inv['last_name']}: Risk Profile: {inv['risk_profile']}, AUM: ₹{inv['amt_aum']:,.2f}, KYC: {inv['kyc_status']}, Folios: {inv.get('folio_count', 0)}"
+        for inv in investors
+    ])
+    scope = f" (group {index + 1} of {total_chunks})" if total_chunks > 1 else ""
+    return f"""{task}
 
-Investors:
+Investors{scope}:
 {investor_summary}
 
-Provide the response in JSON format with keys: executive_summary, action_items (array), risk_alerts (array)."""
-        else:
-            prompt = f"Analyze these investors: {investor_summary}"
-        
-        # user_message = UserMessage(text=prompt) # This line was commented out in the original file
-        # response = await chat.send_message(user_message) # This line was commented out in the original file
-        
-        # Mock response for live AI
-        import json
+{LLM_RESPONSE_FORMAT}"""
+
+def build_reduce_prompt(analysis_type: str, partials: List[dict], total_investors: int) -> str:
+    task = ANALYSIS_PROMPT_TASKS.get(analysis_type, "Analyze these investors")
+    parts = "\n".join(json.dumps(partial, ensure_ascii=False, sort_keys=True) for partial in partials)
+    return f"""{task}
+
+The {total_investors} investors were analyzed in groups. Merge these partial analyses into one,
+keeping the most important action items and every distinct risk alert:
+{parts}
+
+{LLM_RESPONSE_FORMAT}"""
+
+# AI Analysis Routes
+# The live path streams only the fields the prompts use; a selection's documents are never
+# held in memory, only one prompt string per LLM_CHUNK_SIZE investors.
+LIVE_ANALYSIS_PROJECTION = {
+    "_id": 0,
+    "investor_id": 1,
+    "first_name": 1,
+    "last_name": 1,
+    "risk_profile": 1,
+    "kyc_status": 1,
+    "amt_aum": 1,
+    "folio_count": ANALYSIS_COLUMN_PROJECTIONS["folio_count"],
+}
+
+async def map_reduce_live_analysis(llm: LLMClient, analysis_type: str, query: dict, expected_size: int, keep_ids: bool) -> Optional[AnalysisResult]:
+    # Map: every investor is covered by exactly one chunk prompt, built as soon as its chunk fills
+    chunk_size = max(1, LLM_CHUNK_SIZE)
+    max_chunks = max(1, LLM_MAX_MAP_CALLS)
+    total_chunks = max(1, -(-expected_size // chunk_size))
+    chunk_prompts = []
+    investor_ids = []
+    investor_count = 0
+    chunk = []
+    
+    def flush():
+        if len(chunk_prompts) >= max_chunks:
+            raise LLMError(f"selection grew past {chunk_size * max_chunks} investors")
+        chunk_prompts.append(build_chunk_prompt(analysis_type, chunk, len(chunk_prompts), total_chunks))
+    
+    pipeline = [{"$match": query}, {"$project": LIVE_ANALYSIS_PROJECTION}]
+    async for doc in db.investors.aggregate(pipeline, batchSize=chunk_size):
+        chunk.append(doc)
+        investor_count += 1
+        if keep_ids:
+            investor_ids.append(doc["investor_id"])
+        if len(chunk) >= chunk_size:
+            flush()
+            chunk = []
+    if chunk:
+        flush()
+    if not investor_count:
+        return None
+    partials = await gather_llm_calls(llm, chunk_prompts)
+    
+    # Reduce: fold partial analyses FANIN at a time until one remains
+    fanin = max(2, LLM_REDUCE_FANIN)
+    while len(partials) > 1:
+        groups = [partials[i:i + fanin] for i in range(0, len(partials), fanin)]
+        partials = await gather_llm_calls(llm, [
+            build_reduce_prompt(analysis_type, group, investor_count) if len(group) > 1 else None
+            for group in groups
+        ], passthrough=[group[0] for group in groups])
+    result = partials[0]
+    
+    return AnalysisResult(
+        investor_ids=investor_ids,
+        investor_count=investor_count,
+        analysis_type=analysis_type,
+        executive_summary=str(result.get("executive_summary") or "Analysis completed"),
+        action_items=[str(item) for item in result.get("action_items") or []],
+        risk_alerts=[str(item) for item in result.get("risk_alerts") or []],
+        details={
+            "total_investors": investor_count,
+            "ai_generated": True,
+            "model": llm.model,
+            "prompt_chunks": len(chunk_prompts)
+        }
+    )
+
+async def run_live_analysis(analysis_type: str, query: dict, expected_size: int, keep_ids: bool = True) -> Optional[AnalysisResult]:
+    # Any reason not to use the model falls back to the analysis engine over the same query
+    llm = get_llm_client()
+    max_investors = max(1, LLM_CHUNK_SIZE) * max(1, LLM_MAX_MAP_CALLS)
+    if llm is None:
+        reason = "LLM_API_KEY not configured"
+    elif expected_size > max_investors:
+        reason = f"selection of {expected_size} investors exceeds the live limit of {max_investors}"
+    else:
         try:
-            result = json.loads(prompt) # Mock parsing for demonstration
-        except:
-            result = {
-                "executive_summary": "Analysis completed (mock)",
-                "action_items": ["Review generated analysis", "Follow up with clients"],
-                "risk_alerts": []
-            }
-        
-        return AnalysisResult(
-            investor_ids=[inv["investor_id"] for inv in investors],
-            analysis_type=analysis_type,
-            executive_summary=result.get("executive_summary", "Analysis completed"),
-            action_items=result.get("action_items", []),
-            risk_alerts=result.get("risk_alerts", []),
-            details={
-                "total_investors": len(investors),
-                "ai_generated": True
-            }
-        )
-    except Exception as e:
-        logger.error(f"Error in live AI analysis: {str(e)}")
-        return await run_mock_analysis(analysis_type, investors)
+            return await asyncio.wait_for(
+                map_reduce_live_analysis(llm, analysis_type, query, expected_size, keep_ids),
+                LLM_ANALYSIS_DEADLINE_SECONDS
+            )
+        except asyncio.TimeoutError:
+            reason = f"deadline of {LLM_ANALYSIS_DEADLINE_SECONDS}s exceeded"
+        except Exception as e:
+            reason = str(e)
+    logger.error(f"Error in live AI analysis: {reason}")
+    return await run_analysis_engine(analysis_type, query, expected_size, keep_ids=keep_ids)
 
 @api_router.post("/analysis/run", response_model=AnalysisResult)
 async def run_analysis(
     request: AnalysisRequest,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
-    investors = await db.investors.find(
-        {"investor_id": {"$in": request.investor_ids}},
-        {"_id": 0}
-    ).to_list(1000)
+    if request.selection:
+        query = build_selection_query(request.selection)
+    else:
+        query = {"investor_id": {"$in": request.investor_ids}}
     
-    if not investors:
+    if request.force:
+        # A forced run neither reads nor writes the memo, so it only needs the size
+        fingerprint = {"count": await db.investors.count_documents(query)}
+        cache_key = None
+    else:
+        fingerprint = await analysis_input_fingerprint(query)
+        cache_key = analysis_cache_key(request, fingerprint) if fingerprint else None
+    if not fingerprint or not fingerprint["count"]:
         raise HTTPException(status_code=404, detail="No investors found")
     
+    if cache_key:
+        memoized = await find_memoized_analysis(cache_key)
+        if memoized:
+            response.headers["X-Analysis-Cache"] = "hit"
+            return memoized
+    
     if request.use_live_ai:
-        result = await run_live_analysis(request.analysis_type, investors)
+        result = await run_live_analysis(request.analysis_type, query, fingerprint["count"], keep_ids=request.selection is None)
     else:
-        result = await run_mock_analysis(request.analysis_type, investors)
+        result = await run_analysis_engine(request.analysis_type, query, fingerprint["count"], keep_ids=request.selection is None)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No investors found")
+    
+    if request.selection:
+        # Store what was selected, not who: the filter replays the selection, the count sizes it
+        result.selection = request.selection.model_dump(exclude_none=True)
+        result.investor_ids = []
+        result.investor_count = result.investor_count or fingerprint["count"]
     
     # Save analysis
     result_dict = result.model_dump()
-    result_dict["created_at"] = result_dict["created_at"].isoformat()
+    # A live request that fell back to the mock result is not memoized, so the next one retries the model
+    memoize = cache_key is not None and (not request.use_live_ai or result.details.get("ai_generated", False))
+    if memoize:
+        result_dict["cache_key"] = cache_key
     await db.analyses.insert_one(result_dict)
+    result_dict.pop("_id", None)
+    if memoize:
+        analysis_cache.set(cache_key, result_dict)
+    await apply_dashboard_delta({"analyses_count": 1})
     
+    response.headers["X-Analysis-Cache"] = "miss"
     return result
 
+ANALYSIS_PROJECTION = {"_id": 0, **{field: 1 for field in AnalysisResult.model_fields}}
+
 @api_router.get("/analysis/history", response_model=List[AnalysisResult])
 async def get_analysis_history(current_user: User = Depends(get_current_user)):
-    analyses = await db.analyses.find({}, {"_id": 0}).sort("created_at", -1).limit(50).to_list(50)
+    analyses = await db.analyses.find({}, ANALYSIS_PROJECTION).sort("created_at", -1).limit(50).to_list(50)
     
     for analysis in analyses:
-        if isinstance(analysis.get('created_at'), str):
-            analysis['created_at'] = datetime.fromisoformat(analysis['created_at'])
+        # Analyses stored before selections existed
+        analysis.setdefault("investor_count", len(analysis.get("investor_ids", [])))
+        analysis.setdefault("selection", None)
     
+    if (await current_feature_flags()).fast_json_responses:
+        return FastJSONResponse(analyses)
     return analyses
 
-@api_router.get("/analysis/report/{analysis_id}/pdf")
-async def download_analysis_pdf(
-    analysis_id: str,
-    current_user: User = Depends(get_current_user)
-):
-    analysis = await db.analyses.find_one({"analysis_id": analysis_id}, {"_id": 0})
-    if not analysis:
-        raise HTTPException(status_code=404, detail="Analysis not found")
-    
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
+# PDF reports
+# Style objects are built once per process; reportlab only reads them while laying out.
+REPORT_STYLES = getSampleStyleSheet()
+REPORT_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=REPORT_STYLES['Heading1'],
+    fontSize=24,
+    textColor=colors.HexColor('#1a365d'),
+    spaceAfter=30
+)
+
+def build_analysis_elements(analysis: dict) -> list:
+    styles = REPORT_STYLES
     elements = []
-    styles = getSampleStyleSheet()
     
     # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1a365d'),
-        spaceAfter=30
-    )
-    elements.append(Paragraph(f"AI Analysis Report", title_style))
+    elements.append(Paragraph(f"AI Analysis Report", REPORT_TITLE_STYLE))
     elements.append(Spacer(1, 0.2*inch))
     
     # Analysis Details
     elements.append(Paragraph(f"<b>Analysis Type:</b> {analysis['analysis_type']}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Date:</b> {analysis.get('created_at', 'N/A')}", styles['Normal']))
+    created_at = analysis.get('created_at', 'N/A')
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    elements.append(Paragraph(f"<b>Date:</b> {created_at}", styles['Normal']))
     elements.append(Spacer(1, 0.3*inch))
     
     # Executive Summary
@@ -707,62 +3402,383 @@ async def download_analysis_pdf(
         for alert in analysis['risk_alerts']:
             elements.append(Paragraph(f"⚠️ {alert}", styles['Normal']))
     
-    doc.build(elements)
-    buffer.seek(0)
+    return elements
+
+def render_analysis_pdf(analysis: dict) -> bytes:
+    # Runs in the report worker pool
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    doc.build(build_analysis_elements(analysis))
+    return buffer.getvalue()
+
+report_pool = BoundedWorkerPool(
+    "report", REPORT_RENDER_KIND, REPORT_RENDER_WORKERS, REPORT_RENDER_MAX_QUEUE,
+    "Report rendering is busy, please retry"
+)
+
+# Size-bounded on-disk cache of rendered PDFs. Analyses are immutable, so an entry is keyed
+# only by analysis_id and REPORT_TEMPLATE_VERSION and never needs invalidating; the least
+# recently served files are evicted once the directory grows past REPORT_CACHE_MAX_BYTES.
+class ReportCache:
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # get/put run in threadpool workers; the lock guards the index and the byte count
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Path, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        # Caller holds self._lock
+        if self._loaded:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = sorted(self.directory.glob("*.pdf"), key=lambda path: path.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._entries[path] = size
+            self._total_bytes += size
+        self._loaded = True
+
+    @staticmethod
+    def etag(analysis_id: str) -> str:
+        return hashlib.sha256(f"{analysis_id}:{REPORT_TEMPLATE_VERSION}".encode()).hexdigest()[:32]
+
+    def path_for(self, analysis_id: str) -> Path:
+        return self.directory / f"{self.etag(analysis_id)}.pdf"
+
+    def get(self, analysis_id: str) -> Optional[Path]:
+        path = self.path_for(analysis_id)
+        with self._lock:
+            self._load()
+            try:
+                size = path.stat().st_size
+                os.utime(path)
+            except FileNotFoundError:
+                # Another worker may have evicted it
+                self._total_bytes -= self._entries.pop(path, 0)
+                self.misses += 1
+                return None
+            if path not in self._entries:
+                self._entries[path] = size
+                self._total_bytes += size
+            self._entries.move_to_end(path)
+            self.hits += 1
+        return path
+
+    def open(self, analysis_id: str):
+        # An open handle stays readable if another request evicts the file meanwhile
+        path = self.get(analysis_id)
+        if path is None:
+            return None
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self.hits -= 1
+                self.misses += 1
+            return None
+
+    def put(self, analysis_id: str, content: bytes) -> Path:
+        path = self.path_for(analysis_id)
+        with self._lock:
+            self._load()
+        # The write happens outside the lock; the tmp name is unique per process and thread
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes -= self._entries.pop(path, 0)
+            self._entries[path] = len(content)
+            self._total_bytes += len(content)
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, size = self._entries.popitem(last=False)
+                evicted.unlink(missing_ok=True)
+                self._total_bytes -= size
+        return path
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+report_cache = ReportCache(REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES)
+
+async def render_cached_analysis_pdf(analysis: dict) -> bytes:
+    content = await report_pool.run(render_analysis_pdf, analysis)
+    await run_in_threadpool(report_cache.put, analysis["analysis_id"], content)
+    return content
+
+def iter_report_file(report_file, chunk_size: int = 64 * 1024):
+    with report_file:
+        while chunk := report_file.read(chunk_size):
+            yield chunk
+
+@api_router.get("/analysis/report/{analysis_id}/pdf")
+async def download_analysis_pdf(
+    analysis_id: str,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    etag = report_cache.etag(analysis_id)
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "private, max-age=86400",
+        "Content-Disposition": f"attachment; filename=analysis_{analysis_id}.pdf"
+    }
+    
+    # A cached file implies the analysis exists, so a hit needs no database round trip.
+    # The file is opened before responding, so an eviction in between cannot break the send.
+    report_file = await run_in_threadpool(report_cache.open, analysis_id)
+    if report_file is None:
+        analysis = await db.analyses.find_one({"analysis_id": analysis_id}, {"_id": 0})
+        if not analysis:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": headers["ETag"]})
+        content = await render_cached_analysis_pdf(analysis)
+        return Response(content, media_type="application/pdf", headers=headers)
+    
+    if _etag_matches(if_none_match, etag):
+        report_file.close()
+        return Response(status_code=304, headers={"ETag": headers["ETag"]})
+    headers["Content-Length"] = str(os.fstat(report_file.fileno()).st_size)
+    return StreamingResponse(iter_report_file(report_file), media_type="application/pdf", headers=headers)
+
+# Report bundles
+# zipfile writes data descriptors when the target cannot seek, so entries can be flushed
+# to the client one at a time instead of assembling the archive in memory.
+class ZipChunkWriter(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+async def load_analysis_pdf(analysis: dict) -> bytes:
+    path = await run_in_threadpool(report_cache.get, analysis["analysis_id"])
+    if path is not None:
+        try:
+            return await run_in_threadpool(path.read_bytes)
+        except FileNotFoundError:
+            pass  # evicted between lookup and read
+    return await render_cached_analysis_pdf(analysis)
+
+async def stream_report_bundle(analyses: List[dict], missing_ids: List[str]):
+    writer = ZipChunkWriter()
+    archive = zipfile.ZipFile(writer, mode="w", compression=zipfile.ZIP_DEFLATED)
+    manifest = {"included": [], "failed": [{"analysis_id": analysis_id, "error": "Analysis not found"} for analysis_id in missing_ids]}
+    # Leave room in the shared render queue for single downloads
+    semaphore = asyncio.Semaphore(max(1, report_pool.workers * 2))
+
+    async def render(analysis: dict):
+        async with semaphore:
+            try:
+                return analysis, await load_analysis_pdf(analysis), None
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                return analysis, None, detail
+
+    for finished in asyncio.as_completed([render(analysis) for analysis in analyses]):
+        analysis, content, error = await finished
+        if error is not None:
+            manifest["failed"].append({"analysis_id": analysis["analysis_id"], "error": error})
+            continue
+        archive.writestr(f"analysis_{analysis['analysis_id']}.pdf", content)
+        manifest["included"].append(analysis["analysis_id"])
+        yield writer.drain()
+
+    archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+    archive.close()
+    yield writer.drain()
+
+@api_router.post("/analysis/report/bundle")
+async def download_report_bundle(
+    request: ReportBundleRequest,
+    current_user: User = Depends(get_current_user)
+):
+    if request.analysis_ids is not None:
+        requested = list(dict.fromkeys(request.analysis_ids))
+        if len(requested) > REPORT_BUNDLE_MAX_ITEMS:
+            raise HTTPException(status_code=400, detail=f"At most {REPORT_BUNDLE_MAX_ITEMS} analyses per bundle")
+        query = {"analysis_id": {"$in": requested}}
+        limit = len(requested)
+    else:
+        requested = None
+        query = {}
+        if request.analysis_type:
+            query["analysis_type"] = request.analysis_type
+        created = {}
+        if request.created_from:
+            created["$gte"] = request.created_from
+        if request.created_to:
+            created["$lte"] = request.created_to
+        if created:
+            query["created_at"] = created
+        limit = request.limit or REPORT_BUNDLE_MAX_ITEMS
+    
+    analyses = await db.analyses.find(query, {"_id": 0, "investor_ids": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+    found = {analysis["analysis_id"] for analysis in analyses}
+    missing_ids = [analysis_id for analysis_id in requested if analysis_id not in found] if requested else []
+    if not analyses:
+        raise HTTPException(status_code=404, detail="No analyses found")
     
+    filename = f"analysis_reports_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}.zip"
     return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=analysis_{analysis_id}.pdf"}
+        stream_report_bundle(analyses, missing_ids),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+# Feature flags
+# Flags are served from process memory. Every update bumps a version on the settings
+# document; a background poller reads only that version and reloads the flags when it moves,
+# so other workers converge within FEATURE_FLAGS_REFRESH_SECONDS.
+FEATURE_FLAGS_KEY = {"type": "feature_flags"}
+_feature_flags: Optional[FeatureFlags] = None
+_feature_flags_version = -1
+_feature_flags_poller_task: Optional[asyncio.Task] = None
+
+def _store_feature_flags(doc: dict):
+    global _feature_flags, _feature_flags_version
+    _feature_flags = FeatureFlags(**doc)
+    _feature_flags_version = doc.get("version", 0)
+
+async def ensure_feature_flags():
+    # Earlier versions could race and insert duplicates; keep the oldest so the unique index can build
+    duplicates = await db.settings.find(FEATURE_FLAGS_KEY, {"_id": 1}).sort("_id", 1).to_list(None)
+    if len(duplicates) > 1:
+        await db.settings.delete_many({"_id": {"$in": [doc["_id"] for doc in duplicates[1:]]}})
+    doc = await db.settings.find_one_and_update(
+        FEATURE_FLAGS_KEY,
+        {"$setOnInsert": {**FeatureFlags().model_dump(), "version": 1}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    _store_feature_flags(doc)
+
+async def refresh_feature_flags():
+    current = await db.settings.find_one(FEATURE_FLAGS_KEY, {"_id": 0, "version": 1})
+    if current is None:
+        await ensure_feature_flags()
+    elif current.get("version", 0) != _feature_flags_version:
+        _store_feature_flags(await db.settings.find_one(FEATURE_FLAGS_KEY, {"_id": 0}))
+
+async def feature_flags_poller():
+    while True:
+        await asyncio.sleep(FEATURE_FLAGS_REFRESH_SECONDS)
+        try:
+            await refresh_feature_flags()
+        except Exception as e:
+            logger.error(f"Feature flag refresh failed: {e}")
+
+async def current_feature_flags() -> FeatureFlags:
+    if _feature_flags is None:
+        await ensure_feature_flags()
+    return _feature_flags
 
 # Settings Routes
 @api_router.get("/settings/feature-flags", response_model=FeatureFlags)
 async def get_feature_flags(current_user: User = Depends(get_current_user)):
-    flags = await db.settings.find_one({"type": "feature_flags"}, {"_id": 0})
-    if not flags:
-        default_flags = FeatureFlags()
-        await db.settings.insert_one({"type": "feature_flags", **default_flags.model_dump()})
-        return default_flags
-    return FeatureFlags(**flags)
+    return await current_feature_flags()
 
 @api_router.put("/settings/feature-flags", response_model=FeatureFlags)
 async def update_feature_flags(
     flags: FeatureFlags,
     current_user: User = Depends(get_current_user)
 ):
-    await db.settings.update_one(
-        {"type": "feature_flags"},
-        {"$set": flags.model_dump()},
-        upsert=True
+    doc = await db.settings.find_one_and_update(
+        FEATURE_FLAGS_KEY,
+        {"$set": flags.model_dump(), "$inc": {"version": 1}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
+    _store_feature_flags(doc)
     return flags
 
+@api_router.get("/settings/cache-stats")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    return {
+        "token_cache": token_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "facets_cache": facets_cache.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "llm_client": llm_client.stats() if llm_client else None,
+        "password_pool": password_pool.stats(),
+        "report_pool": report_pool.stats(),
+        "report_cache": report_cache.stats()
+    }
+
+@api_router.get("/settings/index-report")
+async def get_index_report(current_user: User = Depends(get_current_user)):
+    report = await explain_query_shapes()
+    return {
+        "ok": not any(entry["collscan"] for entry in report),
+        "shapes": report
+    }
+
 @api_router.post("/settings/reseed-data")
 async def reseed_data(current_user: User = Depends(get_current_user)):
-    await db.investors.delete_many({})
-    await generate_seed_investors()
-    return {"message": "Seed data regenerated successfully"}
+    # The small demo set, run inline but under the same job claim as /settings/synthetic-data
+    # so it can never drop collections under a running load
+    spec = SyntheticDataSpec(seed=random.randrange(2 ** 32), workers=0)
+    job = await claim_synthetic_data_job(spec)
+    if not job:
+        raise HTTPException(status_code=409, detail="A synthetic data load is already running")
+    outcome = await run_synthetic_data_job(job, spec)
+    if outcome["status"] != "completed":
+        raise HTTPException(status_code=500, detail=f"Seed data regeneration failed: {outcome['failure']}")
+    return {"message": "Seed data regenerated successfully", **outcome["result"]}
+
+@api_router.post("/settings/synthetic-data", status_code=202)
+async def create_synthetic_data_job(spec: SyntheticDataSpec, current_user: User = Depends(get_current_user)):
+    job = await start_synthetic_data_job(spec)
+    if not job:
+        raise HTTPException(status_code=409, detail="A synthetic data load is already running")
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+@api_router.get("/settings/synthetic-data")
+async def get_synthetic_data_job(current_user: User = Depends(get_current_user)):
+    job = await db.settings.find_one(SYNTHETIC_JOB_KEY, {"_id": 0, "type": 0, "owner": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="No synthetic data load has run")
+    return job
 
 # Dashboard Stats
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
-    total_investors = await db.investors.count_documents({})
-    kyc_pending = await db.investors.count_documents({"kyc_status": "N"})
-    
-    pipeline = [
-        {"$group": {"_id": None, "total_aum": {"$sum": "$amt_aum"}}}
-    ]
-    aum_result = await db.investors.aggregate(pipeline).to_list(1)
-    total_aum = aum_result[0]["total_aum"] if aum_result else 0
-    
-    recent_analyses = await db.analyses.count_documents({})
+    stats = await db.settings.find_one(DASHBOARD_STATS_KEY, {"_id": 0})
+    if not stats or "reconciled_at" not in stats:
+        stats = await reconcile_dashboard_stats()
     
     return {
-        "total_investors": total_investors,
-        "kyc_pending": kyc_pending,
-        "total_aum": total_aum,
-        "recent_analyses": recent_analyses
+        "total_investors": stats.get("total_investors", 0),
+        "kyc_pending": stats.get("kyc_pending", 0),
+        "total_aum": stats.get("total_aum", 0),
+        "recent_analyses": stats.get("analyses_count", 0)
     }
 
 # Include router
@@ -774,6 +3790,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Truncated", "Link"],
 )
 
 logging.basicConfig(
@@ -782,6 +3799,56 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def bootstrap_indexes():
+    await ensure_feature_flags()
+    await ensure_indexes()
+
+@app.on_event("startup")
+async def seed_demo_data():
+    # Off the request path and idempotent: a fixed seed gives every worker the same ids, so a
+    # racing second load only hits duplicate keys
+    if SEED_DEMO_ON_STARTUP and not await db.investors.find_one({}, {"_id": 1}):
+        await start_synthetic_data_job(SyntheticDataSpec(reset=False, workers=0))
+
+@app.on_event("startup")
+async def start_feature_flags_poller():
+    global _feature_flags_poller_task
+    _feature_flags_poller_task = asyncio.create_task(feature_flags_poller())
+
+@app.on_event("startup")
+async def start_import_job_supervisor():
+    global _import_supervisor_task
+    _import_supervisor_task = asyncio.create_task(import_job_supervisor())
+
+async def run_datetime_backfill():
+    # Idempotent and cheap once done: the $type filter matches nothing on converted data
+    try:
+        converted = await backfill_datetimes()
+        if any(converted.values()):
+            logger.info(f"Converted ISO-string timestamps to BSON dates: {converted}")
+    except Exception as e:
+        logger.error(f"Datetime backfill failed: {e}")
+
+@app.on_event("startup")
+async def start_datetime_backfill():
+    global _datetime_backfill_task
+    _datetime_backfill_task = asyncio.create_task(run_datetime_backfill())
+
+@app.on_event("startup")
+async def start_dashboard_stats_reconciler():
+    global _dashboard_reconciler_task
+    _dashboard_reconciler_task = asyncio.create_task(dashboard_stats_reconciler())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    for task in (_import_supervisor_task, _dashboard_reconciler_task, _feature_flags_poller_task, _synthetic_data_task, _datetime_backfill_task):
+        if task is not None:
+            task.cancel()
+    client.close()
+    password_pool.shutdown()
+    report_pool.shutdown()
+    if _import_executor is not None:
+        _import_executor.shutdown(wait=False, cancel_futures=True)
+    if llm_client is not None:
+        await llm_client.aclose()
\ No newline at end of file
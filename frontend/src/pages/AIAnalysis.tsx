@@ -39,6 +39,7 @@ interface AnalysisHistoryType {
   analysis_id: number;
   analysis_type: "risk_summary" | "allocation_check";
   investor_ids: number[];
+  investor_count: number;
 }
 
 export default function AIAnalysis() {
@@ -346,7 +347,7 @@ export default function AIAnalysis() {
                           : "Allocation Check"}
                       </p>
                       <p className="text-sm text-gray-500">
-                        {analysis.investor_ids.length} investors analyzed
+                        {analysis.investor_count} investors analyzed
                       </p>
                     </div>
                   </div>
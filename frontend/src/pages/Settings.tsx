@@ -173,9 +173,9 @@ export default function Settings() {
         <CardContent className="space-y-4">
           <Alert>
             <AlertDescription>
-              Regenerating seed data will delete all existing investors and
-              create 50 new dummy investors with realistic data. This action
-              cannot be undone.
+              Regenerating seed data will delete all existing investors,
+              transactions and holdings and create 50 new dummy investors with
+              realistic data. This action cannot be undone.
             </AlertDescription>
           </Alert>
 
@@ -50,9 +50,7 @@ const Signup: React.FC<SignupProps> = ({ onLogin }) => {
         password,
       });
 
-      toast.success(
-        "Account created successfully! 50 dummy investors have been seeded."
-      );
+      toast.success("Account created successfully!");
       onLogin(response.data.user, response.data.token);
       navigate("/dashboard");
     } catch (error: unknown) {